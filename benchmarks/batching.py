@@ -0,0 +1,116 @@
+"""
+Effective pixels per second of shape-bucketed batches against naive batches.
+
+Effective pixels are the letterboxed image pixels that are not padding. A
+naive batch is padded to its largest member; `Detector.detect_buckets` groups
+frames of the same stride-aligned shape first. Without --weights only the
+padding overhead of both strategies is reported, e.g.:
+
+    python -m benchmarks.batching --shapes 480x640,720x1280,1280x720 --frames 48
+    python -m benchmarks.batching --images data/images --weights yolov5s.pt
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.inference import load_images
+from ppe.inference import BACKENDS, Detector
+
+
+def synthetic_frames(shapes, count, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = [tuple(int(v) for v in shape.split("x")) for shape in shapes.split(",")]
+    return [
+        rng.integers(0, 255, (*sizes[i % len(sizes)], 3), dtype=np.uint8)
+        for i in rng.permutation(count)
+    ]
+
+
+def content_pixels(detector, image):
+    height, width = image.shape[:2]
+    ratio = detector.size / max(height, width)
+    return round(height * ratio) * round(width * ratio)
+
+
+def padded_pixels(detector, images, batch_size, bucketed):
+    """
+    Pixels the detector processes for `images` under each strategy
+    """
+    groups = {}
+    for image in images:
+        key = detector.batch_shape(image) if bucketed else None
+        groups.setdefault(key, []).append(image)
+
+    total = 0
+    for group in groups.values():
+        for start in range(0, len(group), batch_size):
+            batch = group[start : start + batch_size]
+            shapes = [detector.batch_shape(image) for image in batch]
+            height = max(h for h, _ in shapes)
+            width = max(w for _, w in shapes)
+            total += height * width * len(batch)
+    return total
+
+
+def detect_naive(detector, images, batch_size):
+    for start in range(0, len(images), batch_size):
+        detector.detect(images[start : start + batch_size])
+
+
+def detect_bucketed(detector, images, batch_size):
+    detector.detect_buckets(images, max_batch=batch_size)
+
+
+def timed(detector, detect, images, batch_size, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        detect(detector, images, batch_size)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", help="Directory of mixed-resolution frames")
+    parser.add_argument("--shapes", default="480x640,720x1280,1280x720")
+    parser.add_argument("--frames", type=int, default=48)
+    parser.add_argument("--weights", help="Run inference with these weights")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="pytorch")
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    opt = parser.parse_args()
+
+    images = (
+        load_images(opt.images)
+        if opt.images
+        else synthetic_frames(opt.shapes, opt.frames)
+    )
+    detector = (
+        BACKENDS[opt.backend](opt.weights, size=opt.size)
+        if opt.weights
+        else Detector(None, size=opt.size)
+    )
+    effective = sum(content_pixels(detector, image) for image in images)
+
+    print(f"{len(images)} frames, size {opt.size}, batch {opt.batch_size}")
+    print(f"{'strategy':<10}{'padding':>10}{'seconds':>10}{'eff. Mpx/s':>12}")
+    for label, bucketed in (("naive", False), ("bucketed", True)):
+        processed = padded_pixels(detector, images, opt.batch_size, bucketed)
+        padding = 1 - effective / processed
+        if not opt.weights:
+            print(f"{label:<10}{padding:>10.1%}{'-':>10}{'-':>12}")
+            continue
+
+        detect = detect_bucketed if bucketed else detect_naive
+        detector.detect(images[:1])  # warm-up
+        seconds = timed(detector, detect, images, opt.batch_size, opt.runs)
+        print(
+            f"{label:<10}{padding:>10.1%}{seconds:>10.2f}"
+            f"{effective / seconds / 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare per-frame CPU of the disk handoff against the shared-memory ring.
+
+The disk path JPEG-encodes a decoded frame, writes it, reads it back and
+decodes it again, which is what capture -> Event.image -> analyzer costs.
+The ring path copies the frame into a `FrameRing` slot and reads it as a
+view. Both are run in one process on synthetic frames, e.g.:
+
+    python -m benchmarks.framebuffer --frames 200 --shape 1080 1920
+"""
+
+import argparse
+import tempfile
+import time
+import uuid
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from ppe.framebuffer import FrameRing
+
+
+def synthetic_frames(shape, count):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (*shape, 3), dtype=np.uint8)
+    # Mostly static scene with a little noise, like a real camera.
+    return [
+        np.clip(base + rng.integers(0, 8, base.shape, dtype=np.uint8), 0, 255)
+        for _ in range(count)
+    ]
+
+
+def disk_handoff(frames, directory):
+    camera = uuid.uuid4()
+    for index, frame in enumerate(frames):
+        path = Path(directory) / f"{camera}-{index}.jpg"
+        buffer = BytesIO()
+        Image.fromarray(frame).save(buffer, format="JPEG", quality=90)
+        path.write_bytes(buffer.getvalue())
+        decoded = np.asarray(Image.open(BytesIO(path.read_bytes())).convert("RGB"))
+        assert decoded.shape == frame.shape
+
+
+def ring_handoff(frames, ring, consumer):
+    camera = uuid.uuid4()
+    for frame in frames:
+        ring.put(frame, camera)
+        (received,) = consumer.read(1)
+        assert received.image.shape == frame.shape
+        del received
+        consumer.release(1)
+
+
+def cpu_time(function, *args):
+    start = time.process_time()
+    function(*args)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--shape", type=int, nargs=2, default=[1080, 1920])
+    opt = parser.parse_args()
+
+    frames = synthetic_frames(tuple(opt.shape), opt.frames)
+    ring = FrameRing.create(slots=4, shape=tuple(opt.shape))
+    consumer = FrameRing.attach(ring.name)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            disk = cpu_time(disk_handoff, frames, directory)
+        shared = cpu_time(ring_handoff, frames, ring, consumer)
+    finally:
+        consumer.close()
+        ring.close()
+
+    height, width = opt.shape
+    print(f"{opt.frames} frames of {width}x{height}")
+    print(f"{'handoff':<10}{'ms/frame':>10}")
+    for label, seconds in (("disk", disk), ("ring", shared)):
+        print(f"{label:<10}{seconds / opt.frames * 1000:>10.2f}")
+    print(f"CPU saved: {1 - shared / disk:.1%}")
+
+
+if __name__ == "__main__":
+    main()
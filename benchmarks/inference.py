@@ -0,0 +1,146 @@
+"""
+Compare an exported CPU backend against the FP32 PyTorch detector.
+
+Reports per-frame latency, batched throughput and mAP@0.5 of the candidate
+measured against the FP32 detections (used as ground truth) on a fixed set of
+local images, e.g.:
+
+    python -m benchmarks.inference --images data/images \\
+        --weights yolov5s.pt --backend onnx --model yolov5s-int8.onnx
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from ppe.inference import BACKENDS, TorchDetector
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_images(directory):
+    paths = sorted(
+        p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    return [np.asarray(Image.open(p).convert("RGB")) for p in paths]
+
+
+def box_iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def average_precision(references, predictions, class_id, iou_threshold=0.5):
+    """
+    All-point interpolated AP of one class over all frames
+    """
+    scored, total = [], 0
+    for reference, prediction in zip(references, predictions):
+        truth = np.array([d.xyxy for d in reference if d.class_id == class_id])
+        total += len(truth)
+        matched = np.zeros(len(truth), dtype=bool)
+        candidates = sorted(
+            (d for d in prediction if d.class_id == class_id),
+            key=lambda d: -d.confidence,
+        )
+        for detection in candidates:
+            hit = False
+            if len(truth):
+                ious = box_iou(np.array(detection.xyxy), truth)
+                ious[matched] = 0
+                best = ious.argmax()
+                if ious[best] >= iou_threshold:
+                    matched[best] = hit = True
+            scored.append((detection.confidence, hit))
+
+    if not total:
+        return None
+
+    scored.sort(key=lambda item: -item[0])
+    hits = np.cumsum([hit for _, hit in scored])
+    precision = hits / np.arange(1, len(scored) + 1)
+    recall = hits / total
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    recall = np.concatenate([[0.0], recall, [recall[-1] if len(recall) else 0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    return float(np.sum(np.diff(recall) * precision[1:]))
+
+
+def mean_average_precision(references, predictions):
+    classes = {d.class_id for frame in references for d in frame}
+    aps = [average_precision(references, predictions, c) for c in classes]
+    aps = [ap for ap in aps if ap is not None]
+    return sum(aps) / len(aps) if aps else 0.0
+
+
+def measure(detector, images, batch_size, runs):
+    detector.detect(images[:1])  # warm-up
+
+    latencies = []
+    for _ in range(runs):
+        for image in images:
+            start = time.perf_counter()
+            detector.detect([image])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for i in range(0, len(images), batch_size):
+            detector.detect(images[i : i + batch_size])
+    throughput = runs * len(images) / (time.perf_counter() - start)
+
+    detections = [detector.detect([image])[0] for image in images]
+    return latencies, throughput, detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", required=True)
+    parser.add_argument("--weights", required=True, help="FP32 PyTorch weights")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), required=True)
+    parser.add_argument("--model", required=True, help="Candidate model file")
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    opt = parser.parse_args()
+
+    images = load_images(opt.images)
+    baseline = TorchDetector(opt.weights, size=opt.size)
+    candidate = BACKENDS[opt.backend](opt.model, size=opt.size)
+
+    rows = []
+    reference = None
+    for label, detector in (("pytorch-fp32", baseline), (opt.backend, candidate)):
+        latencies, throughput, detections = measure(
+            detector, images, opt.batch_size, opt.runs
+        )
+        reference = reference or detections
+        rows.append(
+            (
+                label,
+                statistics.median(latencies) * 1000,
+                statistics.quantiles(latencies, n=20)[-1] * 1000,
+                throughput,
+                mean_average_precision(reference, detections),
+            )
+        )
+
+    print(f"{len(images)} images, size {opt.size}, batch {opt.batch_size}")
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'fps':>10}{'mAP@.5':>10}")
+    for label, p50, p95, fps, mAP in rows:
+        print(f"{label:<16}{p50:>10.1f}{p95:>10.1f}{fps:>10.1f}{mAP:>10.3f}")
+    print(f"mAP drift vs FP32: {rows[1][4] - rows[0][4]:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure cold-start time and baseline memory per process type.
+
+Every process type is started in a fresh interpreter, the wall time until it
+is ready to serve (or to pull work) and its peak RSS are reported together
+with the heavy inference modules it ended up importing, e.g.:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --load-model --backend onnx --weights best.onnx
+
+The web process must never list torch, onnxruntime or the YOLO packages.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from ppe.inference import HEAVY_MODULES
+
+# Django resolves the URLconf on the first request, import it explicitly so
+# the web process is measured fully loaded.
+PROCESSES = {
+    "python": "",
+    "web": "import settings.wsgi, settings.urls",
+    "scheduler": "django.setup(); import ppe.management.commands.schedule_sampling",
+    "worker": "django.setup(); import ppe.management.commands.analyze_events",
+}
+
+CHILD = """
+import json, os, resource, sys
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.settings")
+{code}
+print(json.dumps({{
+    "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy": sorted({{m.split(".")[0] for m in sys.modules}} & set({heavy!r})),
+}}))
+"""
+
+
+def start(code, env):
+    """
+    Run `code` in a fresh interpreter, returns (seconds, rss MB, heavy modules)
+    """
+    script = CHILD.format(code=code, heavy=HEAVY_MODULES)
+    begin = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    seconds = time.perf_counter() - begin
+    result = json.loads(output.splitlines()[-1])
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return seconds, result["rss"] / scale, result["heavy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--load-model",
+        action="store_true",
+        help="also measure a worker that has loaded the configured detector",
+    )
+    parser.add_argument("--backend", help="overrides PPE_INFERENCE_BACKEND")
+    parser.add_argument("--weights", help="overrides PPE_INFERENCE_WEIGHTS")
+    opt = parser.parse_args()
+
+    env = dict(os.environ)
+    if opt.backend:
+        env["PPE_INFERENCE_BACKEND"] = opt.backend
+    if opt.weights:
+        env["PPE_INFERENCE_WEIGHTS"] = opt.weights
+
+    processes = dict(PROCESSES)
+    if opt.load_model:
+        processes["worker+model"] = (
+            processes["worker"] + "; from ppe.inference import get_detector"
+            "; get_detector()"
+        )
+
+    print(f"{'process':<14}{'p50 s':>8}{'max s':>8}{'RSS MB':>9}  heavy imports")
+    for label, code in processes.items():
+        runs = [start(code, env) for _ in range(opt.runs)]
+        seconds = [run[0] for run in runs]
+        rss = statistics.median(run[1] for run in runs)
+        heavy = ", ".join(runs[-1][2]) or "-"
+        print(
+            f"{label:<14}{statistics.median(seconds):>8.2f}{max(seconds):>8.2f}"
+            f"{rss:>9.1f}  {heavy}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare random (uuid4) against time-ordered (uuid7) primary keys on inserts.
+
+Rows shaped like `ppe_event` are bulk-inserted into a fresh SQLite database
+per key type, keys stored the way Django stores a UUIDField on SQLite
+(32 hex chars in a separate primary key index). The page cache is kept
+smaller than the index so locality matters as it does on a busy server.
+Insert throughput, primary key index size and its leaf fill are reported,
+e.g.:
+
+    python -m benchmarks.uuid_keys --rows 1000000 --batch-size 1000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.settings")
+
+import django
+
+django.setup()
+
+from ppe.models import uuid7
+
+SCHEMA = """
+CREATE TABLE ppe_event (
+    uuid char(32) NOT NULL PRIMARY KEY,
+    camera_id char(32) NOT NULL,
+    timestamp datetime NOT NULL,
+    image varchar(100) NOT NULL,
+    is_analyzed bool NOT NULL,
+    is_violation bool NOT NULL,
+    violation_type varchar(255) NOT NULL
+)
+"""
+KEYS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def insert(path, generate, rows, batch_size, cache_mb):
+    """
+    Bulk-insert rows, returns (rows/s, index MB, index leaf fill)
+    """
+    db = sqlite3.connect(path)
+    db.execute(f"PRAGMA cache_size = -{cache_mb * 1024}")
+    db.execute(SCHEMA)
+    cameras = [uuid.uuid4().hex for _ in range(16)]
+    begin = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        count = min(batch_size, rows - offset)
+        db.executemany(
+            "INSERT INTO ppe_event VALUES (?, ?, datetime('now'), ?, 0, 0, '')",
+            (
+                (generate().hex, cameras[i % len(cameras)], f"cam/{offset + i}.jpg")
+                for i in range(count)
+            ),
+        )
+        db.commit()
+    seconds = time.perf_counter() - begin
+
+    size, unused = db.execute(
+        "SELECT sum(pgsize), sum(unused) FROM dbstat"
+        " WHERE name = 'sqlite_autoindex_ppe_event_1' AND pagetype = 'leaf'"
+    ).fetchone()
+    (total,) = db.execute(
+        "SELECT sum(pgsize) FROM dbstat WHERE name = 'sqlite_autoindex_ppe_event_1'"
+    ).fetchone()
+    db.close()
+    return rows / seconds, total / (1 << 20), 1 - unused / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--cache-mb", type=int, default=2)
+    opt = parser.parse_args()
+
+    print(f"{opt.rows} rows in batches of {opt.batch_size}")
+    print(f"{'key':<8}{'rows/s':>10}{'index MB':>10}{'leaf fill':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, generate in KEYS.items():
+            path = os.path.join(directory, f"{label}.sqlite3")
+            speed, size, fill = insert(
+                path, generate, opt.rows, opt.batch_size, opt.cache_mb
+            )
+            print(f"{label:<8}{speed:>10.0f}{size:>10.1f}{fill:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
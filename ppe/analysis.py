@@ -0,0 +1,300 @@
+"""
+Event analysis: run the configured detector over `Event.image` frames and
+record the outcome on the events, or over decoded frames handed over in
+shared memory and keep only the relevant ones as events.
+"""
+
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable
+from datetime import timedelta
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from ppe import inference
+from ppe.cache import ResultCache, get_result_cache
+from ppe.inference import Detector, get_detector
+from ppe.models import AnalysisTask, Camera, Detection, Event
+from ppe.roi import crop_regions, merge_detections
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from ppe.framebuffer import Frame
+    from ppe.sharding import Shard
+
+logger = logging.getLogger(__name__)
+
+
+def read_image(event: Event) -> bytes:
+    with event.image.open("rb") as f:
+        return f.read()
+
+
+def decode_frame(data: bytes) -> "np.ndarray":
+    """
+    Decode encoded image bytes into an RGB array
+    """
+    import numpy as np
+
+    return np.asarray(Image.open(BytesIO(data)).convert("RGB"))
+
+
+def classify(detections: list[inference.Detection]):
+    """
+    Derive (is_violation, violation_type) from detections
+    """
+    violations = sorted(
+        {d.name for d in detections if d.name in settings.PPE_VIOLATION_CLASSES}
+    )
+    return bool(violations), ",".join(violations)
+
+
+def save_results(results):
+    """
+    Persist {event_pk: detections}: the detection rows in bulk and the event
+    outcome with one UPDATE per distinct (is_violation, violation_type)
+    """
+    from ppe.api import EventAPI
+
+    outcomes = defaultdict(list)
+    rows = []
+    for pk, detections in results.items():
+        outcomes[classify(detections)].append(pk)
+        rows.extend(
+            Detection(
+                event_id=pk,
+                class_name=d.name,
+                confidence=d.confidence,
+                x1=d.xyxy[0],
+                y1=d.xyxy[1],
+                x2=d.xyxy[2],
+                y2=d.xyxy[3],
+            )
+            for d in detections
+        )
+
+    with transaction.atomic():
+        # Re-analysis replaces the previous detections of the event.
+        Detection.objects.filter(event_id__in=results.keys()).delete()
+        Detection.objects.bulk_create(rows, batch_size=500)
+
+    for (is_violation, violation_type), pks in outcomes.items():
+        EventAPI.bulk_update(
+            Event.objects.filter(pk__in=pks),
+            {
+                "is_analyzed": True,
+                "is_violation": is_violation,
+                "violation_type": violation_type,
+            },
+        )
+
+
+def detect_frames(detector: Detector, frames: list["np.ndarray"], regions: list):
+    """
+    Detections per frame, every frame cropped to its regions of interest and
+    the crops of all frames run through the detector together
+
+    Crops are scaled by their frame's detector scale, so the detector sees
+    regions at the resolution it would see them in the whole frame.
+    """
+    crops, owners, scales = [], [], []
+    for index, (frame, frame_regions) in enumerate(zip(frames, regions)):
+        scales.append(detector.scale(frame))
+        for crop, offset in crop_regions(frame, frame_regions, scales[index]):
+            crops.append(crop)
+            owners.append((index, offset))
+
+    per_frame = defaultdict(lambda: ([], []))
+    if crops:
+        per_crop = detector.detect_buckets(crops)
+        for (index, offset), detections in zip(owners, per_crop):
+            per_frame[index][0].append(detections)
+            per_frame[index][1].append(offset)
+
+    return [
+        merge_detections(*per_frame[index], iou=detector.iou, scale=scales[index])
+        for index in range(len(frames))
+    ]
+
+
+def analyze_events(
+    events: Iterable[Event],
+    detector: Detector | None = None,
+    batch_size=8,
+    cache: ResultCache | None = None,
+):
+    """
+    Analyze events in batches of `batch_size`, returns number of events analyzed
+
+    Frames found in the result cache reuse the cached detections and are
+    neither decoded nor sent to the detector. The remaining frames are cropped
+    to their camera regions of interest and all crops of the batch go through
+    the detector together, bucketed by shape. Events whose image is missing or
+    cannot be decoded are logged and skipped, they stay unanalyzed.
+    """
+    detector = detector or get_detector()
+    cache = cache or get_result_cache(detector)
+    events = list(events)
+    rois = dict(
+        Camera.objects.filter(pk__in={event.camera_id for event in events})
+        .values_list("pk", "roi")
+        .order_by()
+    )
+
+    failed = 0
+    for start in range(0, len(events), batch_size):
+        results, misses = {}, []
+        for event in events[start : start + batch_size]:
+            try:
+                data = read_image(event)
+                context = json.dumps(rois.get(event.camera_id) or [])
+                key = cache and cache.key(data, event.camera_id, context)
+                detections = cache and cache.get(key)
+                if detections is None:
+                    misses.append((event, key, decode_frame(data)))
+                else:
+                    results[event.pk] = detections
+            except Exception:
+                logger.exception("Skipping event %s, unreadable image", event.pk)
+                failed += 1
+
+        per_frame = detect_frames(
+            detector,
+            [frame for _, _, frame in misses],
+            [rois.get(event.camera_id) for event, _, _ in misses],
+        )
+        for (event, key, _), detections in zip(misses, per_frame):
+            if cache:
+                cache.set(key, detections)
+            results[event.pk] = detections
+
+        save_results(results)
+
+    if cache:
+        logger.debug("Result cache: %s", cache.stats())
+    return len(events) - failed
+
+
+def analyze_frames(
+    frames: list["Frame"],
+    detector: Detector | None = None,
+    keep: Callable[[list[inference.Detection]], bool] | None = None,
+) -> list[Event]:
+    """
+    Analyze frames handed over in shared memory and persist only those that
+    `keep` accepts (by default frames with violations) as analyzed events
+
+    Frames are never decoded here and only kept frames are JPEG-encoded.
+    """
+    detector = detector or get_detector()
+    keep = keep or (lambda detections: classify(detections)[0])
+    cameras = Camera.objects.in_bulk({frame.camera_id for frame in frames})
+    frames = [frame for frame in frames if frame.camera_id in cameras]
+    per_frame = detect_frames(
+        detector,
+        [frame.image for frame in frames],
+        [cameras[frame.camera_id].roi for frame in frames],
+    )
+
+    kept = []
+    for frame, detections in zip(frames, per_frame):
+        if not keep(detections):
+            continue
+        is_violation, violation_type = classify(detections)
+        event = Event(
+            camera=cameras[frame.camera_id],
+            is_analyzed=True,
+            is_violation=is_violation,
+            violation_type=violation_type,
+        )
+        buffer = BytesIO()
+        Image.fromarray(frame.image).save(buffer, format="JPEG", quality=90)
+        event.image.save(f"{event.pk}.jpg", ContentFile(buffer.getvalue()), save=False)
+        kept.append((event, detections))
+
+    if not kept:
+        return []
+
+    events = [event for event, _ in kept]
+    try:
+        with transaction.atomic():
+            Event.objects.bulk_create(events)
+            Detection.objects.bulk_create(
+                [
+                    Detection(
+                        event=event,
+                        class_name=d.name,
+                        confidence=d.confidence,
+                        x1=d.xyxy[0],
+                        y1=d.xyxy[1],
+                        x2=d.xyxy[2],
+                        y2=d.xyxy[3],
+                    )
+                    for event, detections in kept
+                    for d in detections
+                ],
+                batch_size=500,
+            )
+            Camera.objects.add_counts(
+                events=Counter(event.camera_id for event in events),
+                violations=Counter(e.camera_id for e in events if e.is_violation),
+            )
+    except Exception:
+        # Images are stored before the rows, do not leave them orphaned.
+        for event in events:
+            event.image.delete(save=False)
+        raise
+    return events
+
+
+def process_queue(
+    detector: Detector | None = None,
+    batch_size=8,
+    cache: ResultCache | None = None,
+    limit: int | None = None,
+    shard: Optional["Shard"] = None,
+    idle: float | None = None,
+):
+    """
+    Claim and analyze queued events until the queue (or `limit`) runs out,
+    returns number of events analyzed
+
+    With a `shard` only events of the cameras leased by this node are
+    claimed, the leases are renewed before every batch. With `idle` an empty
+    queue does not end the loop: it sleeps `idle` seconds and claims again,
+    which keeps a sharded node heartbeating while it holds no cameras yet
+    and lets it take over the cameras of nodes that go away. Tasks of events
+    that could not be analyzed are dropped as well, so they are not claimed
+    again.
+    """
+    timeout = timedelta(seconds=settings.PPE_ANALYSIS_CLAIM_TIMEOUT)
+    count = 0
+    while limit is None or count < limit:
+        size = batch_size if limit is None else min(batch_size, limit - count)
+        cameras = shard.step() if shard else None
+        tasks = AnalysisTask.objects.claim(size, timeout, cameras=cameras)
+        if not tasks:
+            if idle is None:
+                break
+            time.sleep(idle)
+            continue
+
+        analyze_events(
+            [task.event for task in tasks],
+            detector=detector,
+            batch_size=batch_size,
+            cache=cache,
+        )
+        AnalysisTask.objects.filter(
+            pk__in=[task.pk for task in tasks], claimed_by=tasks[0].claimed_by
+        ).delete()
+        count += len(tasks)
+    return count
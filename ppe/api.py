@@ -1,22 +1,46 @@
+import base64
+from datetime import datetime, timedelta
+from pathlib import Path
 from typing import List, Optional
+from uuid import UUID
 from ninja import Router, Query
+from ninja.errors import HttpError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import QuerySet
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from ninja.pagination import paginate
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
+from collections import Counter
+import queue
 
 from ppe.schemas import (
     CameraSchemaOut,
+    CameraChangesSchemaOut,
+    CameraRateSchemaOut,
     CameraSchemaIn,
     CameraSchemaUpdate,
     EventSchemaOut,
+    EventSparseSchemaOut,
+    EventChangesSchemaOut,
     EventSchemaIn,
     EventSchemaUpdate,
+    EventBulkSchemaUpdate,
+    EventBulkSchemaDelete,
+    BulkSchemaOut,
+    DetectionSchemaOut,
+    QueueSchemaOut,
     ReportSchemaOut,
     ReportSchemaIn,
     ReportSchemaUpdate,
+    TimeseriesSchemaOut,
 )
-from ppe.models import Camera, Event, Report
+from ppe import media, timeseries
+from ppe.ingest import EventBuffer, get_event_buffer
+from ppe.models import AnalysisTask, Camera, Detection, Event, Report
 
 router = Router()
 
@@ -30,6 +54,7 @@ class BaseAPI:
     schema_out = None
     schema_in = None
     schema_update = None
+    bulk_chunk_size = 1000
 
     @classmethod
     def get_queryset(cls, request, **kwargs):
@@ -45,6 +70,197 @@ class BaseAPI:
         """
         return queryset
 
+    @classmethod
+    def select_fields(cls, queryset: QuerySet, fields: Optional[str]):
+        """
+        Narrow queryset to the comma-separated `fields` of `schema_out`
+        """
+        if not fields:
+            return queryset
+
+        columns = {
+            name: field.validation_alias or name
+            for name, field in cls.schema_out.model_fields.items()
+        }
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in columns]
+        if unknown:
+            raise HttpError(400, f"Unknown fields: {', '.join(unknown)}")
+
+        return queryset.values(*(columns[name] for name in requested))
+
+    @classmethod
+    def set_etag(cls, response: HttpResponse, obj):
+        """
+        Expose `updated_at` of obj as a strong ETag
+
+        It versions what clients write: server-maintained columns (camera
+        counters and sampling rates) change without bumping `updated_at`, so
+        event ingestion never fails an If-Match update.
+        """
+        updated_at = obj.get("updated_at") if isinstance(obj, dict) else obj.updated_at
+        if updated_at:
+            response["ETag"] = f'"{updated_at.isoformat()}"'
+
+    @classmethod
+    def parse_if_match(cls, request):
+        """
+        Return the `updated_at` an If-Match header expects, if any
+        """
+        value = request.headers.get("If-Match", "").strip()
+        if not value or value == "*":
+            return None
+
+        try:
+            return datetime.fromisoformat(value.removeprefix("W/").strip('"'))
+        except ValueError:
+            raise HttpError(400, "Malformed If-Match header")
+
+    @classmethod
+    def encode_cursor(cls, updated_at: datetime, uuid) -> str:
+        value = f"{updated_at.isoformat()}|{uuid}".encode()
+        return base64.urlsafe_b64encode(value).decode().rstrip("=")
+
+    @classmethod
+    def decode_cursor(cls, cursor: str):
+        try:
+            value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            updated_at, uuid = value.decode().split("|")
+            return datetime.fromisoformat(updated_at), UUID(uuid)
+        except ValueError:
+            raise HttpError(400, "Malformed cursor")
+
+    @classmethod
+    def changes(cls, queryset: QuerySet, since: Optional[str], limit: int):
+        """
+        Rows created, updated or soft-deleted after the `since` cursor, in
+        (updated_at, uuid) order, with the cursor of the last one
+        """
+        # Transactions still running can commit rows with an updated_at
+        # before the newest one seen, only hand out settled changes.
+        settled = timezone.now() - timedelta(seconds=settings.PPE_SYNC_LAG)
+        queryset = queryset.filter(updated_at__lte=settled)
+        if since:
+            updated_at, uuid = cls.decode_cursor(since)
+            queryset = queryset.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, uuid__gt=uuid)
+            )
+
+        rows = list(queryset.order_by("updated_at", "uuid")[: limit + 1])
+        items = rows[:limit]
+        if items:
+            since = cls.encode_cursor(items[-1].updated_at, items[-1].uuid)
+        return {"items": items, "cursor": since or "", "has_more": len(rows) > limit}
+
+    @classmethod
+    def clean_update(cls, update_data: dict):
+        """
+        Validate update_data against the model fields, 400 on the first error
+        """
+        for key, value in update_data.items():
+            try:
+                cls.model._meta.get_field(key).clean(value, None)
+            except ValidationError as e:
+                raise HttpError(400, f"{key}: {' '.join(e.messages)}")
+
+    @classmethod
+    def update_object(cls, request, uuid: str, update_data: dict):
+        """
+        Write only the changed columns in one UPDATE guarded by If-Match
+        """
+        cls.clean_update(update_data)
+        queryset = cls.model.objects.filter(uuid=uuid)
+        expected = cls.parse_if_match(request)
+        target = queryset if expected is None else queryset.filter(updated_at=expected)
+
+        update_data = {**update_data, "updated_at": timezone.now()}
+        updated = cls.update_queryset(target, update_data)
+        if not updated and expected is not None and queryset.exists():
+            raise HttpError(412, "Object was modified, refetch and retry")
+
+        return get_object_or_404(queryset)
+
+    @classmethod
+    def update_queryset(cls, queryset: QuerySet, update_data: dict):
+        """
+        Run a single UPDATE over queryset, returns affected count
+        """
+        return queryset.update(**update_data)
+
+    @classmethod
+    def delete_queryset(cls, queryset: QuerySet):
+        """
+        Soft-delete queryset with a single UPDATE, returns affected count
+
+        Rows are kept with `is_deleted` set and a fresh `updated_at`, so the
+        change feeds report the deletion.
+        """
+        return queryset.update(is_deleted=True, updated_at=timezone.now())
+
+    @classmethod
+    def bulk_queryset(cls, uuids: Optional[list], filters: Optional[dict]):
+        """
+        Resolve bulk payload target to a queryset, refusing an unbounded one
+        """
+        # An empty filter set or uuid list would match every row.
+        if not uuids and not any(
+            value is not None and value != "" for value in (filters or {}).values()
+        ):
+            raise HttpError(400, "Either uuids or filters must be provided")
+
+        queryset = cls.model.objects.all()
+        if uuids is not None:
+            queryset = queryset.filter(uuid__in=uuids)
+        if filters is not None:
+            queryset = cls.filter_queryset(queryset, filters)
+        return queryset
+
+    @classmethod
+    def iter_chunks(cls, queryset: QuerySet):
+        """
+        Yield primary key chunks of queryset in keyset order
+        """
+        queryset = queryset.order_by("pk").values_list("pk", flat=True)
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            pks = list(chunk[: cls.bulk_chunk_size])
+            if not pks:
+                return
+            yield pks
+            last_pk = pks[-1]
+
+    @classmethod
+    def bulk_update(cls, queryset: QuerySet, update_data: dict):
+        """
+        Apply update_data with one UPDATE per chunk, returns affected count
+        """
+        if not update_data:
+            return 0
+
+        count = 0
+        for pks in cls.iter_chunks(queryset):
+            with transaction.atomic():
+                # Stamped per chunk: a chunk committing after a change feed
+                # cursor was handed out must still sort after it.
+                chunk = cls.model.objects.filter(pk__in=pks)
+                count += cls.update_queryset(
+                    chunk, {**update_data, "updated_at": timezone.now()}
+                )
+        return count
+
+    @classmethod
+    def bulk_delete(cls, queryset: QuerySet):
+        """
+        Delete queryset with one UPDATE per chunk, returns affected count
+        """
+        count = 0
+        for pks in cls.iter_chunks(queryset):
+            with transaction.atomic():
+                chunk = cls.model.objects.filter(pk__in=pks)
+                count += cls.delete_queryset(chunk)
+        return count
+
 
 class CameraAPI(BaseAPI):
     model = Camera
@@ -71,9 +287,32 @@ class CameraAPI(BaseAPI):
 
         return queryset
 
+    @router.get("/cameras/rates", response=List[CameraRateSchemaOut])
+    def get_camera_rates(request):
+        return Camera.objects.filter(is_active=True).only("uuid", "sample_rate")
+
+    @classmethod
+    def delete_queryset(cls, queryset: QuerySet):
+        """
+        Soft-delete the events of the cameras along with them
+        """
+        with transaction.atomic():
+            EventAPI.delete_queryset(Event.objects.filter(camera__in=queryset))
+            return super().delete_queryset(queryset)
+
+    @router.get("/cameras/changes", response=CameraChangesSchemaOut)
+    def get_camera_changes(
+        request,
+        since: Optional[str] = Query(None),
+        limit: int = Query(500, ge=1, le=1000),
+    ):
+        return CameraAPI.changes(Camera.all_objects.all(), since, limit)
+
     @router.get("/cameras/{uuid}", response=CameraSchemaOut)
-    def get_camera(request, uuid: str):
-        return get_object_or_404(Camera, uuid=uuid)
+    def get_camera(request, response: HttpResponse, uuid: str):
+        camera = get_object_or_404(Camera, uuid=uuid)
+        CameraAPI.set_etag(response, camera)
+        return camera
 
     @router.post("/cameras", response=CameraSchemaOut)
     def create_camera(request, payload: CameraSchemaIn):
@@ -84,28 +323,20 @@ class CameraAPI(BaseAPI):
             return {"error": str(e)}
 
     @router.put("/cameras/{uuid}", response=CameraSchemaOut)
-    def update_camera(request, uuid: str, payload: CameraSchemaUpdate):
-        camera = get_object_or_404(Camera, uuid=uuid)
-
-        update_data = payload.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(camera, key, value)
-
-        try:
-            camera.full_clean()
-            camera.save()
-            return camera
-        except Exception as e:
-            return {"error": str(e)}
+    def update_camera(
+        request, response: HttpResponse, uuid: str, payload: CameraSchemaUpdate
+    ):
+        camera = CameraAPI.update_object(
+            request, uuid, payload.dict(exclude_unset=True)
+        )
+        CameraAPI.set_etag(response, camera)
+        return camera
 
     @router.delete("/cameras/{uuid}")
     def delete_camera(request, uuid: str):
-        camera = get_object_or_404(Camera, uuid=uuid)
-        try:
-            camera.delete()
-            return {"success": True}
-        except Exception as e:
-            return {"error": str(e)}
+        if not CameraAPI.delete_queryset(Camera.objects.filter(uuid=uuid)):
+            raise Http404("No Camera matches the given query.")
+        return {"success": True}
 
 
 class EventAPI(BaseAPI):
@@ -114,7 +345,119 @@ class EventAPI(BaseAPI):
     schema_in = EventSchemaIn
     schema_update = EventSchemaUpdate
 
-    @router.get("/events", response=List[EventSchemaOut])
+    @classmethod
+    def update_queryset(cls, queryset: QuerySet, update_data: dict):
+        """
+        Keep camera violation counters in step with flipped `is_violation`
+        """
+        if "is_violation" not in update_data:
+            return super().update_queryset(queryset, update_data)
+
+        is_violation = update_data["is_violation"]
+        with transaction.atomic():
+            flipped = Counter(
+                queryset.select_for_update()
+                .exclude(is_violation=is_violation)
+                .values_list("camera_id", flat=True)
+            )
+            count = super().update_queryset(queryset, update_data)
+            sign = 1 if is_violation else -1
+            Camera.objects.add_counts(
+                violations={camera_id: sign * n for camera_id, n in flipped.items()}
+            )
+        return count
+
+    @classmethod
+    def delete_queryset(cls, queryset: QuerySet):
+        """
+        Keep camera counters in step with deleted events and drop their
+        queued analysis
+        """
+        with transaction.atomic():
+            pks, events, violations = [], Counter(), Counter()
+            rows = queryset.select_for_update().values_list(
+                "pk", "camera_id", "is_violation"
+            )
+            for pk, camera_id, is_violation in rows:
+                pks.append(pk)
+                events[camera_id] -= 1
+                violations[camera_id] -= is_violation
+            count = super().delete_queryset(queryset)
+            Camera.objects.add_counts(events=events, violations=violations)
+            AnalysisTask.objects.filter(event_id__in=pks).delete()
+        return count
+
+    @classmethod
+    def filter_queryset(cls, queryset: QuerySet, filters: dict):
+        if filters.get("camera_uuid"):
+            queryset = queryset.filter(camera__uuid=filters["camera_uuid"])
+
+        if filters.get("is_violation") is not None:
+            queryset = queryset.filter(is_violation=filters["is_violation"])
+
+        if filters.get("start_date"):
+            queryset = queryset.filter(timestamp__gte=filters["start_date"])
+
+        if filters.get("end_date"):
+            queryset = queryset.filter(timestamp__lte=filters["end_date"])
+
+        if (
+            filters.get("detection_class") is not None
+            or filters.get("min_confidence") is not None
+        ):
+            detections = DetectionAPI.filter_queryset(
+                Detection.objects.filter(event=OuterRef("pk")),
+                {
+                    "class_name": filters.get("detection_class"),
+                    "min_confidence": filters.get("min_confidence"),
+                },
+            )
+            queryset = queryset.filter(Exists(detections))
+
+        return queryset
+
+    @classmethod
+    def clean_event(cls, data: dict):
+        """
+        Unsaved event built from data, 404 when its camera is unknown or
+        deleted and 400 on the first validation error
+        """
+        try:
+            found = Camera.objects.filter(pk=data.get("camera_id")).exists()
+        except ValidationError:
+            found = False
+        if not found:
+            raise Http404("No Camera matches the given query.")
+
+        event = cls.model(**data)
+        try:
+            # Empty strings are the model defaults (e.g. violation_type), the
+            # direct create path accepts them as well. The camera is checked
+            # above, the field check would accept deleted ones.
+            event.full_clean(
+                exclude={key for key, value in data.items() if value == ""}
+                | {"camera"},
+                validate_unique=False,
+            )
+        except ValidationError as e:
+            key, messages = next(iter(e.message_dict.items()))
+            raise HttpError(400, f"{key}: {' '.join(messages)}")
+        return event
+
+    @classmethod
+    def buffer_event(cls, buffer: EventBuffer, data: dict):
+        """
+        Validate an event and hand it to the write-behind buffer unsaved,
+        timestamps are set when the buffer writes it
+        """
+        event = cls.clean_event(data)
+        try:
+            buffer.put(event)
+        except queue.Full:
+            raise HttpError(503, "Event buffer is full, retry later")
+        return event
+
+    @router.get("/events", response=List[EventSparseSchemaOut], exclude_unset=True)
     @paginate
     def get_events(
         request,
@@ -122,58 +465,227 @@ class EventAPI(BaseAPI):
         is_violation: Optional[bool] = Query(None),
         start_date: Optional[str] = Query(None),
         end_date: Optional[str] = Query(None),
+        detection_class: Optional[str] = Query(None),
+        min_confidence: Optional[float] = Query(None),
+        fields: Optional[str] = Query(None),
     ):
-        queryset = Event.objects.all()
+        queryset = EventAPI.filter_queryset(
+            Event.objects.all(),
+            {
+                "camera_uuid": camera_uuid,
+                "is_violation": is_violation,
+                "start_date": start_date,
+                "end_date": end_date,
+                "detection_class": detection_class,
+                "min_confidence": min_confidence,
+            },
+        )
+
+        return EventAPI.select_fields(queryset, fields)
+
+    @router.get("/events/changes", response=EventChangesSchemaOut)
+    def get_event_changes(
+        request,
+        since: Optional[str] = Query(None),
+        camera_uuid: Optional[str] = Query(None),
+        limit: int = Query(500, ge=1, le=1000),
+    ):
+        queryset = EventAPI.filter_queryset(
+            Event.all_objects.all(), {"camera_uuid": camera_uuid}
+        )
+        return EventAPI.changes(queryset, since, limit)
 
-        if camera_uuid:
-            queryset = queryset.filter(camera__uuid=camera_uuid)
+    @router.get("/events/timeseries", response=TimeseriesSchemaOut)
+    def get_event_timeseries(
+        request,
+        start_date: datetime = Query(...),
+        end_date: Optional[datetime] = Query(None),
+        camera_uuid: Optional[str] = Query(None),
+        points: int = Query(200, ge=2, le=2000),
+        downsample: bool = Query(False),
+    ):
+        start = (
+            start_date
+            if timezone.is_aware(start_date)
+            else timezone.make_aware(start_date)
+        )
+        end = end_date or timezone.now()
+        end = end if timezone.is_aware(end) else timezone.make_aware(end)
+        if end <= start:
+            raise HttpError(400, "end_date must be after start_date")
+
+        queryset = EventAPI.filter_queryset(
+            Event.objects.all(), {"camera_uuid": camera_uuid}
+        )
+        if not downsample:
+            step = timeseries.choose_step(start, end, points)
+            return {
+                "step": step,
+                "points": timeseries.bucket_counts(
+                    queryset, start, end, step, camera_id=camera_uuid
+                ),
+            }
+
+        # Finer bins thinned back to `points`, keeps short spikes visible.
+        step = timeseries.choose_step(start, end, points * timeseries.LTTB_FACTOR)
+        bins = timeseries.bucket_counts(
+            queryset, start, end, step, camera_id=camera_uuid
+        )
+        return {"step": step, "points": timeseries.lttb(bins, points, "violations")}
+
+    @router.patch("/events/bulk", response=BulkSchemaOut)
+    def bulk_update_events(request, payload: EventBulkSchemaUpdate):
+        queryset = EventAPI.bulk_queryset(
+            payload.uuids, payload.filters and payload.filters.dict()
+        )
+        update_data = payload.data.dict(exclude_unset=True)
+        if not update_data:
+            raise HttpError(400, "data must set at least one field")
+        EventAPI.clean_update(update_data)
+        count = EventAPI.bulk_update(queryset, update_data)
+        return {"count": count}
+
+    @router.delete("/events/bulk", response=BulkSchemaOut)
+    def bulk_delete_events(request, payload: EventBulkSchemaDelete):
+        queryset = EventAPI.bulk_queryset(
+            payload.uuids, payload.filters and payload.filters.dict()
+        )
+        return {"count": EventAPI.bulk_delete(queryset)}
+
+    @router.get("/events/{uuid}", response=EventSparseSchemaOut, exclude_unset=True)
+    def get_event(
+        request,
+        response: HttpResponse,
+        uuid: str,
+        fields: Optional[str] = Query(None),
+    ):
+        queryset = EventAPI.select_fields(Event.objects.all(), fields)
+        event = get_object_or_404(queryset, uuid=uuid)
+        EventAPI.set_etag(response, event)
+        return event
+
+    @router.get("/events/{uuid}/image")
+    def get_event_image(request, uuid: str, w: Optional[int] = Query(None, ge=1)):
+        event = get_object_or_404(Event.objects.only("pk", "image"), uuid=uuid)
+        if not event.image:
+            raise Http404("Event has no image")
+
+        width = media.resolve_width(w)
+        try:
+            path = Path(event.image.path)
+        except NotImplementedError:
+            # Remote storages serve and cache their files themselves.
+            return HttpResponseRedirect(event.image.url)
+        if not path.is_file():
+            raise Http404("Image file is missing")
+
+        etag = media.image_etag(event.uuid, path, width)
+        if width and not media.is_fresh(request, etag):
+            path = media.get_derivative_cache().get(path, etag, width)
+        return media.serve_file(request, path, etag)
+
+    @router.post("/events", response={200: EventSchemaOut, 202: EventSparseSchemaOut})
+    def create_event(request, payload: EventSchemaIn):
+        buffer = get_event_buffer()
+        if buffer:
+            return 202, EventAPI.buffer_event(buffer, payload.dict())
 
-        if is_violation is not None:
-            queryset = queryset.filter(is_violation=is_violation)
+        event = EventAPI.clean_event(payload.dict())
+        with transaction.atomic():
+            event.save()
+            Camera.objects.add_counts(
+                events={event.camera_id: 1},
+                violations={event.camera_id: int(event.is_violation)},
+            )
+            if not event.is_analyzed:
+                AnalysisTask.objects.enqueue([event])
+        return event
 
-        if start_date:
-            queryset = queryset.filter(timestamp__gte=start_date)
+    @router.put("/events/{uuid}", response=EventSchemaOut)
+    def update_event(
+        request, response: HttpResponse, uuid: str, payload: EventSchemaUpdate
+    ):
+        event = EventAPI.update_object(request, uuid, payload.dict(exclude_unset=True))
+        EventAPI.set_etag(response, event)
+        return event
 
-        if end_date:
-            queryset = queryset.filter(timestamp__lte=end_date)
+    @router.post("/events/{uuid}/recheck")
+    def recheck_event(request, uuid: str):
+        event = get_object_or_404(Event.objects.only("pk", "camera_id"), uuid=uuid)
+        AnalysisTask.objects.enqueue([event], priority=AnalysisTask.PRIORITY_RECHECK)
+        return {"success": True}
 
-        return queryset
+    @router.delete("/events/{uuid}")
+    def delete_event(request, uuid: str):
+        if not EventAPI.delete_queryset(Event.objects.filter(uuid=uuid)):
+            raise Http404("No Event matches the given query.")
+        return {"success": True}
 
-    @router.get("/events/{uuid}", response=EventSchemaOut)
-    def get_event(request, uuid: str):
-        return get_object_or_404(Event, uuid=uuid)
 
-    @router.post("/events", response=EventSchemaOut)
-    def create_event(request, payload: EventSchemaIn):
-        try:
-            event = Event.objects.create(**payload.dict())
-            return event
-        except Exception as e:
-            return {"error": str(e)}
+class DetectionAPI(BaseAPI):
+    model = Detection
+    schema_out = DetectionSchemaOut
 
-    @router.put("/events/{uuid}", response=EventSchemaOut)
-    def update_event(request, uuid: str, payload: EventSchemaUpdate):
-        event = get_object_or_404(Event, uuid=uuid)
+    @classmethod
+    def filter_queryset(cls, queryset: QuerySet, filters: dict):
+        if filters.get("class_name"):
+            queryset = queryset.filter(class_name=filters["class_name"])
 
-        update_data = payload.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(event, key, value)
+        if filters.get("min_confidence") is not None:
+            queryset = queryset.filter(confidence__gte=filters["min_confidence"])
 
-        try:
-            event.full_clean()
-            event.save()
-            return event
-        except Exception as e:
-            return {"error": str(e)}
+        if filters.get("event_uuid"):
+            queryset = queryset.filter(event_id=filters["event_uuid"])
 
-    @router.delete("/events/{uuid}")
-    def delete_event(request, uuid: str):
-        event = get_object_or_404(Event, uuid=uuid)
-        try:
-            event.delete()
-            return {"success": True}
-        except Exception as e:
-            return {"error": str(e)}
+        if filters.get("camera_uuid"):
+            queryset = queryset.filter(event__camera_id=filters["camera_uuid"])
+
+        if filters.get("start_date"):
+            queryset = queryset.filter(event__timestamp__gte=filters["start_date"])
+
+        if filters.get("end_date"):
+            queryset = queryset.filter(event__timestamp__lte=filters["end_date"])
+
+        return queryset
+
+    @router.get("/detections", response=List[DetectionSchemaOut])
+    @paginate
+    def get_detections(
+        request,
+        class_name: Optional[str] = Query(None),
+        min_confidence: Optional[float] = Query(None),
+        event_uuid: Optional[str] = Query(None),
+        camera_uuid: Optional[str] = Query(None),
+        start_date: Optional[str] = Query(None),
+        end_date: Optional[str] = Query(None),
+    ):
+        return DetectionAPI.filter_queryset(
+            Detection.objects.filter(event__is_deleted=False).order_by(
+                "-confidence", "pk"
+            ),
+            {
+                "class_name": class_name,
+                "min_confidence": min_confidence,
+                "event_uuid": event_uuid,
+                "camera_uuid": camera_uuid,
+                "start_date": start_date,
+                "end_date": end_date,
+            },
+        )
+
+
+class AnalysisAPI:
+    @router.get("/analysis/queue", response=QueueSchemaOut)
+    def get_analysis_queue(request):
+        now = timezone.now()
+        cameras = [
+            {**row, "oldest_age": (now - row["oldest"]).total_seconds()}
+            for row in AnalysisTask.objects.lag()
+        ]
+        return {
+            "depth": sum(row["depth"] for row in cameras),
+            "cameras": cameras,
+        }
 
 
 class ReportAPI(BaseAPI):
@@ -200,8 +712,10 @@ class ReportAPI(BaseAPI):
         return queryset
 
     @router.get("/reports/{uuid}", response=ReportSchemaOut)
-    def get_report(request, uuid: str):
-        return get_object_or_404(Report, uuid=uuid)
+    def get_report(request, response: HttpResponse, uuid: str):
+        report = get_object_or_404(Report, uuid=uuid)
+        ReportAPI.set_etag(response, report)
+        return report
 
     @router.post("/reports", response=ReportSchemaOut)
     def create_report(request, payload: ReportSchemaIn):
@@ -212,25 +726,17 @@ class ReportAPI(BaseAPI):
             return {"error": str(e)}
 
     @router.put("/reports/{uuid}", response=ReportSchemaOut)
-    def update_report(request, uuid: str, payload: ReportSchemaUpdate):
-        report = get_object_or_404(Report, uuid=uuid)
-
-        update_data = payload.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(report, key, value)
-
-        try:
-            report.full_clean()
-            report.save()
-            return report
-        except Exception as e:
-            return {"error": str(e)}
+    def update_report(
+        request, response: HttpResponse, uuid: str, payload: ReportSchemaUpdate
+    ):
+        report = ReportAPI.update_object(
+            request, uuid, payload.dict(exclude_unset=True)
+        )
+        ReportAPI.set_etag(response, report)
+        return report
 
     @router.delete("/reports/{uuid}")
     def delete_report(request, uuid: str):
-        report = get_object_or_404(Report, uuid=uuid)
-        try:
-            report.delete()
-            return {"success": True}
-        except Exception as e:
-            return {"error": str(e)}
+        if not ReportAPI.delete_queryset(Report.objects.filter(uuid=uuid)):
+            raise Http404("No Report matches the given query.")
+        return {"success": True}
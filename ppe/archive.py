@@ -0,0 +1,228 @@
+"""
+Cold-tier archive of old events.
+
+`manage.py archive_events` moves events out of the hot table into
+date-partitioned, columnar parts on local disk:
+
+    PPE_ARCHIVE_DIR/events/date=2024-01-31/part-<id>/<column>.gz
+
+Every column is encoded on its own (UUIDs as 16 raw bytes, datetimes as
+int64 microseconds, booleans as bytes, text as JSON) and gzip-compressed,
+so aggregates only decompress the columns they need and only the date
+partitions of the requested range. A part is written to a temporary
+directory and renamed into place, readers never see partial parts.
+
+Camera counters are lifetime totals and are not touched by archiving,
+`manage.py recount` includes the archive when rebuilding them.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import uuid
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+from ppe.models import Event
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+COLUMNS = {
+    "uuid": "uuid",
+    "camera_id": "uuid",
+    "timestamp": "datetime",
+    "image": "text",
+    "is_analyzed": "bool",
+    "is_violation": "bool",
+    "violation_type": "text",
+    "created_at": "datetime",
+    "updated_at": "datetime",
+    "is_deleted": "bool",
+}
+
+
+def encode(kind: str, values: list) -> bytes:
+    if kind == "uuid":
+        return b"".join(value.bytes for value in values)
+    if kind == "datetime":
+        micros = array(
+            "q", ((value - EPOCH) // timedelta(microseconds=1) for value in values)
+        )
+        if sys.byteorder == "big":
+            micros.byteswap()
+        return micros.tobytes()
+    if kind == "bool":
+        return bytes(bool(value) for value in values)
+    return json.dumps(values).encode()
+
+
+def decode(kind: str, data: bytes) -> list:
+    if kind == "uuid":
+        return [uuid.UUID(bytes=data[i : i + 16]) for i in range(0, len(data), 16)]
+    if kind == "datetime":
+        micros = array("q", data)
+        if sys.byteorder == "big":
+            micros.byteswap()
+        return [EPOCH + timedelta(microseconds=value) for value in micros]
+    if kind == "bool":
+        return [bool(value) for value in data]
+    return json.loads(data)
+
+
+def archive_root() -> Path:
+    return Path(settings.PPE_ARCHIVE_DIR) / "events"
+
+
+def partition_date(path: Path) -> date:
+    return date.fromisoformat(path.name.removeprefix("date="))
+
+
+def write_part(day: date, rows: list[dict]) -> Path:
+    """
+    Write rows as a new part of the `day` partition
+    """
+    partition = archive_root() / f"date={day.isoformat()}"
+    name = f"part-{uuid.uuid4().hex[:12]}"
+    tmp = partition / f".{name}.tmp"
+    tmp.mkdir(parents=True)
+    for column, kind in COLUMNS.items():
+        data = encode(kind, [row[column] for row in rows])
+        with gzip.open(tmp / f"{column}.gz", "wb") as f:
+            f.write(data)
+    path = partition / name
+    os.rename(tmp, path)
+    return path
+
+
+def archived_uuids(day: date) -> set[uuid.UUID]:
+    """
+    Uuids already in the parts of the `day` partition
+    """
+    partition = archive_root() / f"date={day.isoformat()}"
+    return {
+        value
+        for part in sorted(partition.glob("part-*"))
+        for value in read_part(part, ["uuid"])["uuid"]
+    }
+
+
+def archive_events(cutoff: datetime, batch_size=10_000) -> int:
+    """
+    Move events with a timestamp before cutoff into the archive, one part and
+    one DELETE per batch, returns number of events archived
+
+    The part is renamed into place just before the DELETE commits and removed
+    again if it rolls back. A crash in between leaves the batch in both
+    tiers: it is never lost, and the next run only deletes the rows that are
+    already archived instead of writing them twice.
+    """
+    count = 0
+    # Soft-deleted rows are archived too, readers skip them.
+    old = Event.all_objects.filter(timestamp__lt=cutoff).order_by()
+    while True:
+        first = old.order_by("timestamp").values_list("timestamp", flat=True).first()
+        if first is None:
+            return count
+
+        day = first.astimezone(UTC).date()
+        start = datetime(day.year, day.month, day.day, tzinfo=UTC)
+        batch = old.filter(
+            timestamp__gte=start, timestamp__lt=start + timedelta(days=1)
+        )
+        archived = archived_uuids(day)
+        while True:
+            path = None
+            try:
+                with transaction.atomic():
+                    rows = list(batch.order_by("pk").values(*COLUMNS)[:batch_size])
+                    if not rows:
+                        break
+                    new = [row for row in rows if row["uuid"] not in archived]
+                    if new:
+                        path = write_part(day, new)
+                    # Raw DELETE: detections and analysis tasks cascade, camera
+                    # counters keep counting archived events.
+                    Event.all_objects.filter(
+                        pk__in=[row["uuid"] for row in rows]
+                    ).delete()
+            except BaseException:
+                if path:
+                    shutil.rmtree(path, ignore_errors=True)
+                raise
+            count += len(new)
+
+
+def iter_parts(start: datetime | None = None, end: datetime | None = None):
+    """
+    Part directories of the partitions overlapping [start, end)
+    """
+    root = archive_root()
+    if not root.is_dir():
+        return
+    for partition in sorted(root.glob("date=*")):
+        day = partition_date(partition)
+        if start and day < start.astimezone(UTC).date():
+            continue
+        if end and datetime(day.year, day.month, day.day, tzinfo=UTC) >= end:
+            continue
+        yield from sorted(partition.glob("part-*"))
+
+
+def read_part(part: Path, columns: Iterable[str]) -> dict[str, list]:
+    """
+    Decode only the requested columns of a part
+    """
+    result = {}
+    for column in columns:
+        with gzip.open(part / f"{column}.gz", "rb") as f:
+            result[column] = decode(COLUMNS[column], f.read())
+    return result
+
+
+def iter_rows(
+    columns: Iterable[str],
+    start: datetime | None = None,
+    end: datetime | None = None,
+    camera_id=None,
+) -> Iterator[dict]:
+    """
+    Archived rows (only `columns`) with start <= timestamp < end, soft-deleted
+    ones left out
+    """
+    columns = list(dict.fromkeys([*columns, "timestamp", "camera_id"]))
+    camera_id = camera_id and uuid.UUID(str(camera_id))
+    for part in iter_parts(start, end):
+        data = read_part(part, columns)
+        deleted = (
+            data["is_deleted"]
+            if "is_deleted" in data
+            else read_part(part, ["is_deleted"])["is_deleted"]
+        )
+        for is_deleted, *values in zip(deleted, *(data[column] for column in columns)):
+            if is_deleted:
+                continue
+            row = dict(zip(columns, values))
+            if start and row["timestamp"] < start:
+                continue
+            if end and row["timestamp"] >= end:
+                continue
+            if camera_id and row["camera_id"] != camera_id:
+                continue
+            yield row
+
+
+def count_by_camera() -> dict:
+    """
+    Archived {camera_id: (events, violations)}
+    """
+    counts = {}
+    for row in iter_rows(["is_violation"]):
+        events, violations = counts.get(row["camera_id"], (0, 0))
+        counts[row["camera_id"]] = (events + 1, violations + row["is_violation"])
+    return counts
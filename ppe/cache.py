@@ -0,0 +1,202 @@
+"""
+Detection result cache for the analysis pipeline.
+
+Frames are keyed by a content digest (namespaced by the detector that
+produced the results) and, optionally, by a 64-bit difference hash so that
+near-identical frames from an idle camera reuse the previous detections.
+Entries live in a bounded in-memory LRU with an optional on-disk tier for
+exact content matches.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from io import BytesIO
+from pathlib import Path
+
+from ppe.inference import Detection
+
+logger = logging.getLogger(__name__)
+
+
+def difference_hash(image, size=8) -> int:
+    """
+    64-bit dHash of a PIL image, robust to noise and recompression
+    """
+    from PIL import Image
+
+    if image.format == "JPEG":
+        # Let libjpeg decode at reduced scale, the hash only needs 9x8 pixels.
+        image.draft("L", (size * 4, size * 4))
+    pixels = list(image.convert("L").resize((size + 1, size), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            offset = row * (size + 1) + col
+            value = value << 1 | (pixels[offset] > pixels[offset + 1])
+    return value
+
+
+@dataclass(frozen=True)
+class FrameKey:
+    digest: str
+    camera_id: object = None
+    dhash: int | None = None
+    context: str = ""
+
+
+class ResultCache:
+    """
+    Bounded LRU of detections keyed by frame content
+
+    `max_distance` enables the perceptual tier: a miss on the content digest,
+    in memory and on disk, falls back to the most recent frame of the same
+    camera whose dHash is within that Hamming distance.
+    """
+
+    def __init__(
+        self,
+        namespace="",
+        max_entries=1024,
+        directory=None,
+        max_disk_entries=100_000,
+        max_distance=None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self.max_disk_entries = max_disk_entries
+        self.max_distance = max_distance
+        self.entries = OrderedDict()
+        self.hits = {"memory": 0, "perceptual": 0, "disk": 0}
+        self.misses = 0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.disk_entries = len(os.listdir(self.directory))
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = sum(self.hits.values()) + self.misses
+        return sum(self.hits.values()) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "entries": len(self.entries),
+        }
+
+    def key(self, data: bytes, camera_id=None, context="") -> FrameKey:
+        """
+        Key for encoded frame bytes, `context` is any other input that changes
+        the detections (e.g. the camera regions of interest)
+        """
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(self.namespace.encode())
+        digest.update(context.encode())
+        dhash = None
+        if self.max_distance is not None:
+            from PIL import Image
+
+            dhash = difference_hash(Image.open(BytesIO(data)))
+        return FrameKey(digest.hexdigest(), camera_id, dhash, context)
+
+    def get(self, key: FrameKey) -> list[Detection] | None:
+        if key.digest in self.entries:
+            self.entries.move_to_end(key.digest)
+            self.hits["memory"] += 1
+            return self.entries[key.digest][1]
+
+        detections = self.read_disk(key.digest)
+        if detections is not None:
+            self.hits["disk"] += 1
+            self.remember(key, detections)
+            return detections
+
+        # Linear scan, only once both exact tiers missed.
+        if key.dhash is not None:
+            for entry_key, detections in reversed(self.entries.values()):
+                if (
+                    entry_key.camera_id != key.camera_id
+                    or entry_key.context != key.context
+                    or entry_key.dhash is None
+                ):
+                    continue
+                if (entry_key.dhash ^ key.dhash).bit_count() <= self.max_distance:
+                    self.hits["perceptual"] += 1
+                    self.remember(key, detections)
+                    return detections
+
+        self.misses += 1
+        return None
+
+    def set(self, key: FrameKey, detections: list[Detection]):
+        self.remember(key, detections)
+        self.write_disk(key.digest, detections)
+
+    def remember(self, key: FrameKey, detections: list[Detection]):
+        self.entries[key.digest] = (key, detections)
+        self.entries.move_to_end(key.digest)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def read_disk(self, digest: str) -> list[Detection] | None:
+        if not self.directory:
+            return None
+        path = self.directory / f"{digest}.json"
+        try:
+            rows = json.loads(path.read_text())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return [
+            Detection(tuple(xyxy), confidence, class_id, name)
+            for xyxy, confidence, class_id, name in rows
+        ]
+
+    def write_disk(self, digest: str, detections: list[Detection]):
+        if not self.directory:
+            return
+        path = self.directory / f"{digest}.json"
+        rows = [[d.xyxy, d.confidence, d.class_id, d.name] for d in detections]
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(rows))
+        tmp.replace(path)
+        self.disk_entries += 1
+        if self.disk_entries > self.max_disk_entries * 1.1:
+            self.evict_disk()
+
+    def evict_disk(self):
+        """
+        Drop least recently used files down to `max_disk_entries`
+        """
+        paths = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        excess = len(paths) - self.max_disk_entries
+        for path in paths[: max(excess, 0)]:
+            path.unlink(missing_ok=True)
+        self.disk_entries = min(len(paths), self.max_disk_entries)
+        logger.debug("Evicted %s cached results from %s", excess, self.directory)
+
+
+@cache
+def get_result_cache(detector) -> ResultCache | None:
+    """
+    Result cache configured by the PPE_RESULT_CACHE_* settings, one per detector
+    """
+    from django.conf import settings
+
+    if not settings.PPE_RESULT_CACHE_SIZE:
+        return None
+
+    return ResultCache(
+        namespace=f"{detector.name}:{detector.weights}:{detector.size}:{detector.conf}",
+        max_entries=settings.PPE_RESULT_CACHE_SIZE,
+        directory=settings.PPE_RESULT_CACHE_DIR,
+        max_disk_entries=settings.PPE_RESULT_CACHE_DISK_SIZE,
+        max_distance=settings.PPE_RESULT_CACHE_PERCEPTUAL_DISTANCE,
+    )
@@ -0,0 +1,189 @@
+"""
+Shared-memory ring buffer handing decoded frames from a capture process to
+an inference worker on the same host.
+
+The capture process creates the ring and copies every decoded RGB frame
+into the next free slot; the worker attaches by name and gets NumPy views
+of the slots, so frames are never JPEG-encoded, written to disk or decoded
+again. Only frames the worker keeps as events are encoded (see
+`ppe.analysis.analyze_frames`).
+
+A ring has a single producer and a single consumer. The producer owns the
+`head` counter, the consumer the `tail` counter, both only ever grow, so no
+lock is needed. When the consumer falls behind the ring fills up and new
+frames are dropped, a live camera has newer frames coming anyway.
+
+Layout: a 64 byte control block, one 32 byte metadata record per slot and
+the slot pixels, each slot sized for the largest frame.
+"""
+
+import logging
+import uuid
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAGIC = 0x50504652  # "PPFR"
+CONTROL_SIZE = 64
+META_SIZE = 32
+# Rings created by this process, the resource tracker already knows them.
+CREATED = set()
+# Mappings closed while frames still pointed into them, kept until exit.
+RETAINED = []
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Frame:
+    image: "np.ndarray"  # read-only view into the ring, valid until release()
+    camera_id: uuid.UUID
+    seq: int
+
+
+class FrameRing:
+    def __init__(self, name=None, slots=8, shape=(1080, 1920), create=False):
+        from multiprocessing import shared_memory
+
+        import numpy as np
+
+        if create:
+            height, width = shape
+            size = self.data_offset(slots) + slots * height * width * 3
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            CREATED.add(self.shm.name)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.name not in CREATED:
+                # Attaching registers the segment with this process's resource
+                # tracker, which would unlink it on exit under the producer.
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        self.control = np.ndarray(
+            (),
+            dtype=[
+                ("magic", "<u4"),
+                ("slots", "<u4"),
+                ("height", "<u4"),
+                ("width", "<u4"),
+                ("head", "<u8"),
+                ("tail", "<u8"),
+            ],
+            buffer=self.shm.buf,
+        )
+        if create:
+            self.control["magic"] = MAGIC
+            self.control["slots"] = slots
+            self.control["height"], self.control["width"] = shape
+            self.control["head"] = self.control["tail"] = 0
+        elif self.control["magic"] != MAGIC:
+            self.shm.close()
+            raise ValueError(f"{name!r} is not a frame ring")
+
+        self.slots = int(self.control["slots"])
+        self.shape = (int(self.control["height"]), int(self.control["width"]))
+        self.meta = np.ndarray(
+            (self.slots,),
+            dtype=[("height", "<u4"), ("width", "<u4"), ("camera", "V16"), ("_", "V8")],
+            buffer=self.shm.buf,
+            offset=CONTROL_SIZE,
+        )
+        self.pixels = np.ndarray(
+            (self.slots, self.shape[0] * self.shape[1] * 3),
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=self.data_offset(self.slots),
+        )
+        self.owner = create
+        self.dropped = 0
+        self.views = weakref.WeakValueDictionary()
+
+    @classmethod
+    def create(cls, name=None, slots=8, shape=(1080, 1920)) -> "FrameRing":
+        return cls(name=name, slots=slots, shape=shape, create=True)
+
+    @classmethod
+    def attach(cls, name) -> "FrameRing":
+        return cls(name=name)
+
+    @staticmethod
+    def data_offset(slots) -> int:
+        return -(-(CONTROL_SIZE + slots * META_SIZE) // 64) * 64
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self):
+        return int(self.control["head"] - self.control["tail"])
+
+    def slot_view(self, slot, height, width) -> "np.ndarray":
+        return self.pixels[slot, : height * width * 3].reshape(height, width, 3)
+
+    def put(self, frame: "np.ndarray", camera_id) -> bool:
+        """
+        Copy an HxWx3 uint8 frame into the next slot, False when the ring is
+        full and the frame was dropped
+        """
+        height, width = frame.shape[:2]
+        if height > self.shape[0] or width > self.shape[1]:
+            raise ValueError(f"Frame {width}x{height} exceeds the ring slot size")
+
+        head = int(self.control["head"])
+        if head - int(self.control["tail"]) >= self.slots:
+            self.dropped += 1
+            return False
+
+        slot = head % self.slots
+        self.slot_view(slot, height, width)[...] = frame
+        self.meta[slot] = (height, width, uuid.UUID(str(camera_id)).bytes, bytes(8))
+        # Publish only once the pixels and metadata are in place.
+        self.control["head"] = head + 1
+        return True
+
+    def read(self, max_items=8) -> list[Frame]:
+        """
+        Views of up to `max_items` unread frames, oldest first
+
+        The views stay valid until `release()`, the producer does not reuse
+        their slots before.
+        """
+        tail = int(self.control["tail"])
+        count = min(int(self.control["head"]) - tail, max_items)
+        frames = []
+        for seq in range(tail, tail + count):
+            slot = seq % self.slots
+            meta = self.meta[slot]
+            image = self.slot_view(slot, int(meta["height"]), int(meta["width"]))
+            image.flags.writeable = False
+            self.views[seq] = image
+            frames.append(Frame(image, uuid.UUID(bytes=bytes(meta["camera"])), seq))
+        return frames
+
+    def release(self, count: int):
+        """
+        Hand the slots of the `count` oldest read frames back to the producer
+        """
+        self.control["tail"] = int(self.control["tail"]) + count
+
+    def close(self):
+        """
+        Detach, the creating process also removes the segment
+        """
+        del self.control, self.meta, self.pixels
+        if self.views:
+            # NumPy does not pin the mapping: unmapping it now would leave
+            # frames still referenced (e.g. by a traceback) pointing at freed
+            # memory.
+            logger.warning("Frame ring %s closed with frames in use", self.name)
+            RETAINED.append(self.shm)
+        else:
+            self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            CREATED.discard(self.shm.name)
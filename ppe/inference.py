@@ -0,0 +1,340 @@
+"""
+Detector backends used by the event analysis pipeline.
+
+Every backend takes a batch of RGB frames as HxWx3 uint8 arrays and returns
+one list of `Detection` per frame, in frame pixel coordinates. Heavy runtime
+dependencies (torch, onnxruntime and the YOLO `models`/`utils` packages that
+`hubconf` pulls in) are imported inside the backend that needs them.
+
+Backends:
+    pytorch      FP32 YOLO model loaded through `hubconf` (AutoShape)
+    torchscript  TorchScript export, see `manage.py export_model`
+    onnx         ONNX export run with onnxruntime on CPU
+"""
+
+import json
+import math
+from collections import defaultdict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Imported on first use by inference workers only, the web process must never
+# load them (see benchmarks/startup.py).
+HEAVY_MODULES = ("torch", "torchvision", "onnxruntime", "models", "utils")
+
+
+@dataclass(frozen=True)
+class Detection:
+    xyxy: tuple[float, float, float, float]
+    confidence: float
+    class_id: int
+    name: str
+
+
+def letterbox(image: "np.ndarray", shape: tuple[int, int], color=114, scaleup=True):
+    """
+    Resize keeping aspect ratio and pad to `shape` (height, width), smaller
+    images are only padded unless `scaleup`
+
+    Returns the padded image, the scale ratio and the (left, top) padding.
+    """
+    import numpy as np
+    from PIL import Image
+
+    height, width = image.shape[:2]
+    ratio = min(shape[0] / height, shape[1] / width)
+    if not scaleup:
+        ratio = min(ratio, 1.0)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    if (new_width, new_height) != (width, height):
+        image = np.asarray(
+            Image.fromarray(image).resize((new_width, new_height), Image.BILINEAR)
+        )
+
+    left = (shape[1] - new_width) // 2
+    top = (shape[0] - new_height) // 2
+    padded = np.full((shape[0], shape[1], 3), color, dtype=np.uint8)
+    padded[top : top + new_height, left : left + new_width] = image
+    return padded, ratio, (left, top)
+
+
+def non_max_suppression(boxes, scores, class_ids, iou_threshold):
+    """
+    Class-aware greedy NMS over xyxy boxes, returns kept indices
+    """
+    import numpy as np
+
+    if not len(boxes):
+        return np.zeros(0, dtype=int)
+
+    # Offset boxes per class so that different classes never overlap.
+    offset = boxes + (class_ids * (boxes.max() + 1))[:, None]
+    x1, y1, x2, y2 = offset.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+class Detector:
+    """
+    Base class for detector backends
+    """
+
+    name = None
+    stride = 32
+    # Whether a batch is letterboxed to the shapes of its images (AutoShape,
+    # dynamic exports) rather than always to the square `size`.
+    dynamic = True
+
+    def __init__(self, weights, size=640, conf=0.25, iou=0.45, device="cpu"):
+        self.weights = str(weights)
+        self.size = size
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.names = {}
+
+    def detect(self, images: Sequence["np.ndarray"]) -> list[list[Detection]]:
+        raise NotImplementedError
+
+    def scale(self, image: "np.ndarray") -> float:
+        """
+        Factor bringing the long side of image down to `size`, never above 1
+        """
+        return min(self.size / max(image.shape[:2]), 1.0)
+
+    def batch_shape(self, image: "np.ndarray") -> tuple[int, int]:
+        """
+        Smallest stride-aligned (height, width) the image letterboxes into
+        once its long side is scaled down to `size`, smaller images (e.g.
+        region of interest crops) are padded, not enlarged
+        """
+        height, width = image.shape[:2]
+        ratio = self.scale(image)
+        return (
+            math.ceil(height * ratio / self.stride) * self.stride,
+            math.ceil(width * ratio / self.stride) * self.stride,
+        )
+
+    def detect_buckets(self, images, max_batch=32) -> list[list[Detection]]:
+        """
+        Detect with images grouped by `batch_shape`
+
+        A batch is padded to its largest member, so mixing 4:3, 16:9 and
+        portrait frames in one batch spends compute on padding. Each bucket
+        holds a single shape and is run as its own batch(es). Static models
+        pad every batch to the same square, they are only split by size.
+        """
+        buckets = defaultdict(list)
+        for index, image in enumerate(images):
+            buckets[self.batch_shape(image) if self.dynamic else None].append(index)
+
+        results = [None] * len(images)
+        for indices in buckets.values():
+            for start in range(0, len(indices), max_batch):
+                chunk = indices[start : start + max_batch]
+                for index, detections in zip(
+                    chunk, self.detect([images[i] for i in chunk])
+                ):
+                    results[index] = detections
+        return results
+
+
+class TorchDetector(Detector):
+    """
+    FP32 PyTorch model through `hubconf`, pre/post-processing by AutoShape
+    """
+
+    name = "pytorch"
+
+    def __init__(self, weights, **kwargs):
+        super().__init__(weights, **kwargs)
+        import hubconf
+
+        self.model = hubconf.custom(
+            path=self.weights, autoshape=True, _verbose=False, device=self.device
+        )
+        self.model.conf = self.conf
+        self.model.iou = self.iou
+        self.names = dict(enumerate(self.model.names))
+
+    def detect(self, images):
+        # AutoShape scales the long side to `size`, ask for the largest batch
+        # shape so that small images are padded rather than enlarged.
+        size = max(max(self.batch_shape(image)) for image in images)
+        results = self.model(list(images), size=size)
+        return [
+            [
+                Detection(
+                    xyxy=tuple(float(v) for v in row[:4]),
+                    confidence=float(row[4]),
+                    class_id=int(row[5]),
+                    name=self.names.get(int(row[5]), str(int(row[5]))),
+                )
+                for row in xyxy.tolist()
+            ]
+            for xyxy in results.xyxy
+        ]
+
+
+class ExportedDetector(Detector):
+    """
+    Raw exported YOLO graph with letterbox pre-processing and numpy NMS
+
+    The graph takes a (B, 3, size, size) float32 batch and returns
+    (B, N, 5 + classes) predictions as xywh, objectness and class scores.
+    """
+
+    # Exports with dynamic height/width accept any stride-aligned shape,
+    # static ones only the square `size` they were traced with.
+    dynamic = False
+
+    def run(self, batch: "np.ndarray") -> "np.ndarray":
+        raise NotImplementedError
+
+    def detect(self, images):
+        import numpy as np
+
+        shape = (self.size, self.size)
+        if self.dynamic:
+            shapes = [self.batch_shape(image) for image in images]
+            shape = (max(h for h, _ in shapes), max(w for _, w in shapes))
+        batch, transforms = [], []
+        for image in images:
+            # A static graph costs the same whatever the image fills of it.
+            padded, ratio, pad = letterbox(image, shape, scaleup=not self.dynamic)
+            batch.append(padded.transpose(2, 0, 1))
+            transforms.append((ratio, pad, image.shape[:2]))
+
+        batch = np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255
+        predictions = self.run(batch)
+        return [
+            self.postprocess(prediction, *transform)
+            for prediction, transform in zip(predictions, transforms)
+        ]
+
+    def postprocess(self, prediction, ratio, pad, frame_shape):
+        import numpy as np
+
+        scores = prediction[:, 5:] * prediction[:, 4:5]
+        class_ids = scores.argmax(1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        mask = confidences > self.conf
+        prediction = prediction[mask]
+        class_ids, confidences = class_ids[mask], confidences[mask]
+
+        xy, wh = prediction[:, :2], prediction[:, 2:4] / 2
+        boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+        keep = non_max_suppression(boxes, confidences, class_ids, self.iou)
+
+        boxes = (boxes[keep] - np.array(pad * 2)) / ratio
+        height, width = frame_shape
+        boxes = boxes.clip(0, [width, height, width, height])
+        return [
+            Detection(
+                xyxy=tuple(float(v) for v in box),
+                confidence=float(confidence),
+                class_id=int(class_id),
+                name=self.names.get(int(class_id), str(int(class_id))),
+            )
+            for box, confidence, class_id in zip(
+                boxes, confidences[keep], class_ids[keep]
+            )
+        ]
+
+
+class TorchScriptDetector(ExportedDetector):
+    name = "torchscript"
+
+    def __init__(self, weights, **kwargs):
+        super().__init__(weights, **kwargs)
+        import torch
+
+        extra_files = {"config.txt": ""}
+        self.model = torch.jit.load(
+            self.weights, map_location=self.device, _extra_files=extra_files
+        )
+        self.model.eval()
+        if extra_files["config.txt"]:
+            config = json.loads(extra_files["config.txt"])
+            self.names = {int(k): v for k, v in config["names"].items()}
+            self.size = config.get("imgsz", self.size)
+
+    def run(self, batch):
+        import torch
+
+        with torch.inference_mode():
+            output = self.model(torch.from_numpy(batch))
+        output = output[0] if isinstance(output, (list, tuple)) else output
+        return output.numpy()
+
+
+class OnnxDetector(ExportedDetector):
+    name = "onnx"
+
+    def __init__(self, weights, **kwargs):
+        super().__init__(weights, **kwargs)
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(
+            self.weights, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = {int(k): v for k, v in json.loads(metadata["names"]).items()}
+        if "imgsz" in metadata:
+            self.size = int(metadata["imgsz"])
+        self.dynamic = json.loads(metadata.get("dynamic", "false"))
+
+    def run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (TorchDetector, TorchScriptDetector, OnnxDetector)
+}
+
+
+@cache
+def load_detector(backend: str, weights: str, **kwargs) -> Detector:
+    """
+    Load (once per process) the detector backend registered as `backend`
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown inference backend {backend!r}, "
+            f"choose one of: {', '.join(sorted(BACKENDS))}"
+        )
+    return BACKENDS[backend](weights, **kwargs)
+
+
+def get_detector() -> Detector:
+    """
+    Detector configured by the PPE_INFERENCE_* settings
+    """
+    from django.conf import settings
+
+    return load_detector(
+        settings.PPE_INFERENCE_BACKEND,
+        settings.PPE_INFERENCE_WEIGHTS,
+        size=settings.PPE_INFERENCE_SIZE,
+        conf=settings.PPE_INFERENCE_CONFIDENCE,
+    )
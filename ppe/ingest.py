@@ -0,0 +1,172 @@
+"""
+Write-behind buffer for single-event ingestion.
+
+With `PPE_EVENT_BUFFER_SIZE` set, `POST /events` validates the event and
+acknowledges it right away; a background thread then writes buffered events
+with one `bulk_create` every `PPE_EVENT_BUFFER_BATCH` events or
+`PPE_EVENT_BUFFER_DELAY_MS` milliseconds, whichever comes first. The buffer
+is bounded: a full buffer makes requests wait up to `PPE_EVENT_BUFFER_TIMEOUT`
+seconds and then answer 503. It is drained when the process exits.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from functools import cache
+
+from django.db import close_old_connections, connection, transaction
+
+from ppe.models import AnalysisTask, Camera, Event
+
+logger = logging.getLogger(__name__)
+
+
+def write_events(events: list[Event]):
+    """
+    Insert events in bulk with their camera counters and analysis tasks
+    """
+    with transaction.atomic():
+        Event.objects.bulk_create(events)
+        Camera.objects.add_counts(
+            events=Counter(event.camera_id for event in events),
+            violations=Counter(
+                event.camera_id for event in events if event.is_violation
+            ),
+        )
+        AnalysisTask.objects.enqueue(
+            [event for event in events if not event.is_analyzed]
+        )
+
+
+class EventBuffer:
+    """
+    Bounded in-process queue of validated, unsaved events
+    """
+
+    def __init__(self, max_size=10_000, max_items=500, max_delay=0.05, timeout=1.0):
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_size)
+        self.thread = None
+        self.closed = False
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run, name="event-buffer", daemon=True
+        )
+        self.thread.start()
+
+    def put(self, event: Event):
+        """
+        Buffer an event, raises `queue.Full` after waiting `timeout` for room
+        """
+        if self.closed:
+            self.write([event])
+            return
+        self.queue.put(event, timeout=self.timeout)
+
+    def collect(self):
+        """
+        Block for the first event, then gather up to `max_items` of them or
+        until `max_delay` has passed. Returns (events, closing).
+        """
+        item = self.queue.get()
+        events = []
+        deadline = time.monotonic() + self.max_delay
+        while item is not None:
+            events.append(item)
+            remaining = deadline - time.monotonic()
+            if len(events) >= self.max_items or remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return events, item is None
+
+    def run(self):
+        closing = False
+        while not closing:
+            events, closing = self.collect()
+            if not events:
+                continue
+            try:
+                close_old_connections()
+                self.write(events)
+            except Exception:
+                # The thread must outlive any failure, or the buffer fills up
+                # and every request gets 503.
+                self.dropped += len(events)
+                logger.exception("Dropped %s buffered events", len(events))
+        connection.close()
+
+    def write(self, events: list[Event]):
+        try:
+            write_events(events)
+            self.written += len(events)
+            return
+        except Exception:
+            logger.exception("Bulk write of %s buffered events failed", len(events))
+
+        # Isolate the offending rows (e.g. a camera deleted meanwhile).
+        for event in events:
+            try:
+                write_events([event])
+                self.written += 1
+            except Exception:
+                self.dropped += 1
+                logger.exception("Dropped buffered event %s", event.pk)
+
+    def flush(self):
+        """
+        Write everything buffered so far from the calling thread
+        """
+        events = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                events.append(item)
+        for start in range(0, len(events), self.max_items):
+            self.write(events[start : start + self.max_items])
+
+    def close(self):
+        """
+        Stop accepting events into the queue and drain it
+        """
+        self.closed = True
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+
+@cache
+def get_event_buffer() -> EventBuffer | None:
+    """
+    Process-wide buffer configured by the PPE_EVENT_BUFFER_* settings, None
+    when write-behind ingestion is disabled
+    """
+    from django.conf import settings
+
+    if not settings.PPE_EVENT_BUFFER_SIZE:
+        return None
+
+    buffer = EventBuffer(
+        max_size=settings.PPE_EVENT_BUFFER_SIZE,
+        max_items=settings.PPE_EVENT_BUFFER_BATCH,
+        max_delay=settings.PPE_EVENT_BUFFER_DELAY_MS / 1000,
+        timeout=settings.PPE_EVENT_BUFFER_TIMEOUT,
+    )
+    buffer.start()
+    atexit.register(buffer.close)
+    return buffer
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ppe.analysis import process_queue
+from ppe.cache import get_result_cache
+from ppe.inference import BACKENDS, load_detector
+from ppe.sharding import get_shard
+
+
+class Command(BaseCommand):
+    help = "Run the detector over the events in the analysis queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            choices=sorted(BACKENDS),
+            default=settings.PPE_INFERENCE_BACKEND,
+        )
+        parser.add_argument("--weights", default=settings.PPE_INFERENCE_WEIGHTS)
+        parser.add_argument("--batch-size", type=int, default=8)
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Events to analyze, defaults to 1000 (unlimited with --sharded)",
+        )
+        parser.add_argument(
+            "--sharded",
+            action="store_true",
+            help="keep running and only analyze the cameras leased by this node",
+        )
+        parser.add_argument("--node", help="node name, defaults to host:pid")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Seconds to wait on an empty queue when sharded, "
+            "defaults to a third of the lease TTL",
+        )
+
+    def handle(self, *args, **options):
+        detector = load_detector(
+            options["backend"],
+            options["weights"],
+            size=settings.PPE_INFERENCE_SIZE,
+            conf=settings.PPE_INFERENCE_CONFIDENCE,
+        )
+        cache = get_result_cache(detector)
+        shard = get_shard(node=options["node"]) if options["sharded"] else None
+        limit, idle = options["limit"], None
+        if shard:
+            idle = options["interval"] or shard.ttl.total_seconds() / 3
+        elif limit is None:
+            limit = 1000
+        try:
+            count = process_queue(
+                detector=detector,
+                batch_size=options["batch_size"],
+                cache=cache,
+                limit=limit,
+                shard=shard,
+                idle=idle,
+            )
+        finally:
+            if shard:
+                shard.leave()
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {count} events"))
+        if cache:
+            stats = cache.stats()
+            self.stdout.write(
+                f"Result cache hit rate {stats['hit_rate']:.1%} "
+                f"(hits {stats['hits']}, misses {stats['misses']})"
+            )
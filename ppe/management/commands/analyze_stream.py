@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ppe.analysis import analyze_frames
+from ppe.framebuffer import FrameRing
+from ppe.inference import BACKENDS, load_detector
+
+
+class Command(BaseCommand):
+    help = "Analyze frames from a capture process's shared-memory ring"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ring", required=True, help="shared memory name")
+        parser.add_argument(
+            "--backend",
+            choices=sorted(BACKENDS),
+            default=settings.PPE_INFERENCE_BACKEND,
+        )
+        parser.add_argument("--weights", default=settings.PPE_INFERENCE_WEIGHTS)
+        parser.add_argument("--batch-size", type=int, default=8)
+        parser.add_argument(
+            "--idle", type=float, default=0.01, help="Seconds to wait for frames"
+        )
+
+    def handle(self, *args, **options):
+        detector = load_detector(
+            options["backend"],
+            options["weights"],
+            size=settings.PPE_INFERENCE_SIZE,
+            conf=settings.PPE_INFERENCE_CONFIDENCE,
+        )
+        ring = FrameRing.attach(options["ring"])
+        analyzed = kept = 0
+        frames = []
+        try:
+            while True:
+                frames = ring.read(options["batch_size"])
+                if not frames:
+                    time.sleep(options["idle"])
+                    continue
+                count = len(frames)
+                kept += len(analyze_frames(frames, detector=detector))
+                analyzed += count
+                # Drop the views before their slots go back to the producer.
+                del frames
+                ring.release(count)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Drop the views so that close() can unmap the ring.
+            frames = None
+            ring.close()
+        self.stdout.write(
+            self.style.SUCCESS(f"Analyzed {analyzed} frames, kept {kept} as events")
+        )
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ppe.archive import archive_events
+
+
+class Command(BaseCommand):
+    help = "Move old events from the database into the compressed archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            required=True,
+            help="Archive events older than this many days",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of events written and deleted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than"])
+        count = archive_events(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {count} events older than {cutoff:%Y-%m-%d}")
+        )
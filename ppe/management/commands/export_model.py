@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the YOLO detector to TorchScript or ONNX, optionally with "
+        "dynamic int8 quantization, for the CPU inference backends"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--weights", default=settings.PPE_INFERENCE_WEIGHTS)
+        parser.add_argument("--format", choices=["torchscript", "onnx"], default="onnx")
+        parser.add_argument("--imgsz", type=int, default=settings.PPE_INFERENCE_SIZE)
+        parser.add_argument(
+            "--quantize",
+            action="store_true",
+            help="ONNX only: apply dynamic int8 weight quantization",
+        )
+        parser.add_argument(
+            "--dynamic",
+            action="store_true",
+            help="ONNX only: accept any image height/width, so batches of "
+            "frames bucketed by aspect ratio are not padded to a square",
+        )
+        parser.add_argument("--output", help="Defaults next to the weights")
+
+    def handle(self, *args, **options):
+        if options["dynamic"] and options["format"] != "onnx":
+            raise CommandError("--dynamic is only supported for ONNX exports")
+        if options["quantize"] and options["format"] != "onnx":
+            # Eager dynamic quantization only rewrites Linear layers, YOLO is
+            # all convolutions and would be saved as an FP32 "-int8" model.
+            raise CommandError("--quantize is only supported for ONNX exports")
+
+        try:
+            import torch
+            from models.experimental import attempt_load
+            from models.yolo import Detect
+        except ImportError as e:
+            raise CommandError(f"Export needs the YOLO training stack: {e}")
+
+        weights = Path(options["weights"])
+        suffix = ".onnx" if options["format"] == "onnx" else ".torchscript"
+        output = Path(
+            options["output"]
+            or weights.with_name(
+                weights.stem + ("-int8" if options["quantize"] else "") + suffix
+            )
+        )
+
+        model = attempt_load(weights, device="cpu", inplace=True, fuse=True).eval()
+        for module in model.modules():
+            if isinstance(module, Detect):
+                # Return only the concatenated (B, N, 5 + classes) predictions.
+                module.inplace = False
+                module.export = True
+        names = dict(enumerate(model.names))
+        sample = torch.zeros(1, 3, options["imgsz"], options["imgsz"])
+        config = {"names": names, "imgsz": options["imgsz"]}
+
+        if options["format"] == "torchscript":
+            traced = torch.jit.trace(model, sample, strict=False)
+            traced.save(str(output), _extra_files={"config.txt": json.dumps(config)})
+        else:
+            config["dynamic"] = options["dynamic"]
+            self.export_onnx(model, sample, output, config, options["quantize"])
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {output}"))
+
+    def export_onnx(self, model, sample, output, config, quantize):
+        import onnx
+        import torch
+
+        fp32_output = (
+            output.with_name(output.stem + "-fp32.onnx") if quantize else output
+        )
+        torch.onnx.export(
+            model,
+            sample,
+            str(fp32_output),
+            opset_version=17,
+            input_names=["images"],
+            output_names=["output0"],
+            dynamic_axes={
+                "images": (
+                    {0: "batch", 2: "height", 3: "width"}
+                    if config["dynamic"]
+                    else {0: "batch"}
+                ),
+                "output0": {0: "batch", 1: "anchors"},
+            },
+        )
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            # ConvInteger/MatInteger kernels: int8 weights, activations
+            # quantized on the fly, no calibration set required.
+            quantize_dynamic(
+                str(fp32_output), str(output), weight_type=QuantType.QUInt8
+            )
+            fp32_output.unlink()
+
+        exported = onnx.load(str(output))
+        for key, value in config.items():
+            meta = exported.metadata_props.add()
+            meta.key, meta.value = key, json.dumps(value)
+        onnx.save(exported, str(output))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ppe.sharding import get_shard
+
+
+class Command(BaseCommand):
+    help = "Hold leases on this node's share of the cameras"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--node", help="node name, defaults to host:pid")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="Seconds between renewals, defaults to a third of the TTL",
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        shard = get_shard(node=options["node"])
+        interval = options["interval"] or shard.ttl.total_seconds() / 3
+        held = set()
+        try:
+            while True:
+                cameras = shard.step()
+                if cameras != held:
+                    self.stdout.write(
+                        f"{shard.node} holds {len(cameras)} cameras "
+                        f"(+{len(cameras - held)} -{len(held - cameras)})"
+                    )
+                    held = cameras
+                if options["once"]:
+                    return
+                time.sleep(interval)
+        finally:
+            if not options["once"]:
+                shard.leave()
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from ppe.archive import count_by_camera
+from ppe.models import Camera, Event
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized per-camera event and violation counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of cameras recounted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        pks = list(Camera.objects.order_by("pk").values_list("pk", flat=True))
+        archived = count_by_camera()
+        fixed = 0
+
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start : start + batch_size]
+            with transaction.atomic():
+                counts = {
+                    row["camera_id"]: row
+                    for row in Event.objects.filter(camera_id__in=batch)
+                    .values("camera_id")
+                    .annotate(
+                        events=Count("pk"),
+                        violations=Count("pk", filter=Q(is_violation=True)),
+                    )
+                    .order_by()
+                }
+                cameras = list(Camera.objects.select_for_update().filter(pk__in=batch))
+                drifted = []
+                for camera in cameras:
+                    row = counts.get(camera.pk, {"events": 0, "violations": 0})
+                    cold_events, cold_violations = archived.get(camera.pk, (0, 0))
+                    events = row["events"] + cold_events
+                    violations = row["violations"] + cold_violations
+                    if (camera.event_count, camera.violation_count) != (
+                        events,
+                        violations,
+                    ):
+                        camera.event_count = events
+                        camera.violation_count = violations
+                        drifted.append(camera)
+                Camera.objects.bulk_update(drifted, ["event_count", "violation_count"])
+                fixed += len(drifted)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted {len(pks)} cameras, fixed {fixed}")
+        )
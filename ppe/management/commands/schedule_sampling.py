@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ppe.scheduler import get_scheduler
+
+
+class Command(BaseCommand):
+    help = "Periodically recompute adaptive per-camera sampling rates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float, default=10, help="Seconds between updates"
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        scheduler = get_scheduler()
+        while True:
+            rates = scheduler.step()
+            self.stdout.write(
+                f"Scheduled {len(rates)} cameras, "
+                f"{sum(rates.values()):.2f}/{scheduler.budget:.2f} fps"
+            )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
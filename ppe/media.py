@@ -0,0 +1,191 @@
+"""
+Serving of event images.
+
+Event frames never change once written, so responses carry a strong ETag
+and a year-long immutable Cache-Control. The file itself is handed to the
+front server when one is configured (`X-Accel-Redirect` for nginx,
+`X-Sendfile` for Apache/lighttpd); otherwise Django streams it with single
+byte-range support. `?w=` serves a downscaled JPEG, widths are rounded up to
+one of `PPE_MEDIA_WIDTHS` and derivatives are kept in a size-bounded LRU
+directory.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve_width(width: int | None) -> int | None:
+    """
+    Smallest configured width covering `width`, None for the original
+    """
+    if not width:
+        return None
+    widths = sorted(settings.PPE_MEDIA_WIDTHS)
+    return next((w for w in widths if w >= width), None)
+
+
+def image_etag(uuid, path: Path, width: int | None) -> str:
+    """
+    Strong ETag of the event image file as stored now, a replaced file gets
+    a new one even under the same name
+    """
+    stat = path.stat()
+    version = f"{uuid}:{path.name}:{stat.st_mtime_ns}:{stat.st_size}:{width or 0}"
+    digest = hashlib.blake2b(version.encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+class DerivativeCache:
+    """
+    Directory of resized images, least recently served evicted first once
+    it grows past `max_bytes`
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30, quality=85):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = sum(p.stat().st_size for p in self.directory.glob("*.jpg"))
+
+    def get(self, source: Path, key: str, width: int) -> Path:
+        """
+        Path of `source` scaled down to `width`, resized on first request,
+        `key` identifies this version of the source (e.g. its ETag)
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        path = self.directory / f"{digest}-{width}.jpg"
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        from PIL import Image
+
+        with Image.open(source) as image:
+            if image.width <= width:
+                return source
+            height = max(round(image.height * width / image.width), 1)
+            if image.format == "JPEG":
+                # Let libjpeg decode at the smallest scale still >= the target.
+                image.draft("RGB", (width, height))
+            resized = image.convert("RGB").resize((width, height), Image.LANCZOS)
+
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False
+        ) as tmp:
+            resized.save(tmp, "JPEG", quality=self.quality)
+        os.replace(tmp.name, path)
+
+        self.size += path.stat().st_size
+        if self.size > self.max_bytes * 1.1:
+            self.evict()
+        return path
+
+    def evict(self):
+        """
+        Drop least recently served files down to `max_bytes`
+        """
+        paths = sorted(self.directory.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        size = sum(p.stat().st_size for p in paths)
+        evicted = 0
+        for path in paths:
+            if size <= self.max_bytes:
+                break
+            size -= path.stat().st_size
+            path.unlink(missing_ok=True)
+            evicted += 1
+        self.size = size
+        logger.debug("Evicted %s resized images from %s", evicted, self.directory)
+
+
+@cache
+def get_derivative_cache() -> DerivativeCache:
+    """
+    Derivative cache configured by the PPE_MEDIA_CACHE_* settings
+    """
+    directory = settings.PPE_MEDIA_CACHE_DIR or Path(settings.MEDIA_ROOT) / ".resized"
+    return DerivativeCache(directory, max_bytes=settings.PPE_MEDIA_CACHE_MB << 20)
+
+
+def accel_path(path: Path) -> str | None:
+    """
+    Internal nginx location of path, None when it is outside MEDIA_ROOT
+    """
+    try:
+        relative = path.resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+    except ValueError:
+        return None
+    return settings.PPE_MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + relative.as_posix()
+
+
+def range_response(request, path: Path, content_type: str) -> HttpResponse | None:
+    """
+    206/416 response for a single byte-range request, None to send it all
+    """
+    match = RANGE_RE.match(request.headers.get("Range", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+
+    size = path.stat().st_size
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        response = HttpResponse(f.read(end - start + 1), content_type, status=206)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def is_fresh(request, etag: str) -> bool:
+    return etag in request.headers.get("If-None-Match", "")
+
+
+def serve_file(request, path: Path, etag: str) -> HttpResponse:
+    """
+    Conditional, cacheable response for a local file
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_fresh(request, etag):
+        return HttpResponse(status=304, headers=headers)
+
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers["Accept-Ranges"] = "bytes"
+    accel = settings.PPE_MEDIA_ACCEL_PREFIX and accel_path(path)
+    if accel:
+        headers["X-Accel-Redirect"] = accel
+        return HttpResponse(content_type=content_type, headers=headers)
+    if settings.PPE_MEDIA_SENDFILE:
+        headers["X-Sendfile"] = str(path.resolve())
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    response = range_response(request, path, content_type)
+    if response is not None:
+        for key, value in headers.items():
+            response[key] = value
+        return response
+    # Opened last, the response closes the file once it is sent.
+    return FileResponse(path.open("rb"), content_type=content_type, headers=headers)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:10
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Camera = apps.get_model("ppe", "Camera")
+    Event = apps.get_model("ppe", "Event")
+    rows = (
+        Event.objects.values("camera_id")
+        .annotate(
+            events=Count("pk"),
+            violations=Count("pk", filter=Q(is_violation=True)),
+        )
+        .order_by()
+    )
+    for row in rows:
+        Camera.objects.filter(pk=row["camera_id"]).update(
+            event_count=row["events"], violation_count=row["violations"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="camera",
+            name="event_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="camera",
+            name="violation_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
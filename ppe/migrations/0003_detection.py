@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0002_camera_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Detection",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("class_name", models.CharField(max_length=64)),
+                ("confidence", models.FloatField()),
+                ("x1", models.FloatField()),
+                ("y1", models.FloatField()),
+                ("x2", models.FloatField()),
+                ("y2", models.FloatField()),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="detections",
+                        to="ppe.event",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Detections",
+                "indexes": [
+                    models.Index(
+                        fields=["class_name", "confidence"], name="detection_class_conf"
+                    )
+                ],
+            },
+        ),
+    ]
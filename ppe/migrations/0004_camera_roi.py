@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0003_detection"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="camera",
+            name="roi",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
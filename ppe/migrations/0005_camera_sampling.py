@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0004_camera_roi"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="camera",
+            name="sample_rate",
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="camera",
+            name="sample_weight",
+            field=models.FloatField(default=1.0, editable=False),
+        ),
+    ]
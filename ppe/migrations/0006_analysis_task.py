@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def enqueue_unanalyzed(apps, schema_editor):
+    AnalysisTask = apps.get_model("ppe", "AnalysisTask")
+    Event = apps.get_model("ppe", "Event")
+    events = Event.objects.filter(is_analyzed=False).values_list(
+        "pk", "camera_id", "timestamp"
+    )
+    AnalysisTask.objects.bulk_create(
+        (
+            AnalysisTask(event_id=pk, camera_id=camera_id, enqueued_at=timestamp)
+            for pk, camera_id, timestamp in events.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0005_camera_sampling"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("priority", models.SmallIntegerField(default=0)),
+                (
+                    "enqueued_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                ("claimed_by", models.UUIDField(blank=True, null=True)),
+                (
+                    "camera",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="ppe.camera",
+                    ),
+                ),
+                (
+                    "event",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="analysis_task",
+                        to="ppe.event",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Analysis tasks",
+                "indexes": [
+                    models.Index(
+                        fields=["priority", "enqueued_at"], name="task_priority"
+                    ),
+                    models.Index(fields=["camera", "enqueued_at"], name="task_camera"),
+                    models.Index(fields=["claimed_by"], name="task_claim"),
+                ],
+            },
+        ),
+        migrations.RunPython(enqueue_unanalyzed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0006_analysis_task"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["camera", "timestamp"], name="event_camera_time"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0007_event_camera_time"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkerNode",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                (
+                    "heartbeat_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CameraLease",
+            fields=[
+                (
+                    "camera",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="lease",
+                        serialize=False,
+                        to="ppe.camera",
+                    ),
+                ),
+                ("node", models.CharField(max_length=255)),
+                (
+                    "acquired_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("expires_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "Camera leases",
+                "indexes": [
+                    models.Index(fields=["node", "expires_at"], name="lease_node")
+                ],
+            },
+        ),
+    ]
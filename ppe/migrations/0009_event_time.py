@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0008_camera_lease"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["timestamp"], name="event_time"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0009_event_time"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="camera",
+            index=models.Index(fields=["updated_at", "uuid"], name="camera_sync"),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["updated_at", "uuid"], name="event_sync"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+import ppe.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ppe", "0010_sync_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="camera",
+            name="uuid",
+            field=models.UUIDField(
+                default=ppe.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="uuid",
+            field=models.UUIDField(
+                default=ppe.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="report",
+            name="uuid",
+            field=models.UUIDField(
+                default=ppe.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
@@ -1,25 +1,98 @@
+from collections import Counter
 from django.db import models
+from django.db.models import Count, F, Min, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+import os
+import threading
+import time
 import uuid
 
+_uuid7_lock = threading.Lock()
+_uuid7_last = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7) for primary keys
+
+    48 bits of Unix milliseconds, then a 12 bit sequence and 62 random bits.
+    Keys generated by one process are strictly increasing, so inserts append
+    to the right edge of the primary key index instead of splitting random
+    pages. They are regular UUIDs for columns, URLs and the API.
+    """
+    global _uuid7_last
+    rand = int.from_bytes(os.urandom(10), "big")
+    with _uuid7_lock:
+        # 74 bits of timestamp + sequence, bumped past the last key when the
+        # clock has not moved (or stepped back).
+        value = max(time.time_ns() // 1_000_000 << 12 | rand >> 68, _uuid7_last + 1)
+        _uuid7_last = value
+    return uuid.UUID(
+        int=(value >> 12) << 80
+        | 0x7 << 76
+        | (value & 0xFFF) << 64
+        | 0b10 << 62
+        | rand & (1 << 62) - 1
+    )
+
 
 def generate_path(instance, filename):
     return f"{instance.camera.name}/{filename}"
 
 
+class BaseManager(models.Manager):
+    """
+    Rows that are not soft-deleted, `all_objects` includes those as well
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class BaseModel(models.Model):
-    uuid = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    uuid = models.UUIDField(primary_key=True, editable=False, default=uuid7)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by the API deletes so the change feeds can report them.
     is_deleted = models.BooleanField(default=False)
 
+    objects = BaseManager()
+    all_objects = models.Manager()
+
     class Meta:
         abstract = True
 
 
+class CameraManager(BaseManager):
+    def add_counts(self, events=None, violations=None):
+        """
+        Apply per-camera counter deltas ({camera_id: delta}) with F() updates
+        """
+        events, violations = Counter(events or {}), Counter(violations or {})
+        for camera_id in sorted(set(events) | set(violations), key=str):
+            if not events[camera_id] and not violations[camera_id]:
+                continue
+            self.filter(pk=camera_id).update(
+                event_count=F("event_count") + events[camera_id],
+                violation_count=F("violation_count") + violations[camera_id],
+            )
+
+
 class Camera(BaseModel):
     name = models.CharField(max_length=255)
     rtsp_url = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
+    # Regions of interest fed to the detector, see ppe/roi.py for the format.
+    roi = models.JSONField(default=list, blank=True)
+    # Denormalized from Event, see `manage.py recount` to rebuild.
+    event_count = models.IntegerField(default=0, editable=False)
+    violation_count = models.IntegerField(default=0, editable=False)
+    # Maintained by ppe/scheduler.py, frames per second to capture.
+    sample_weight = models.FloatField(default=1.0, editable=False)
+    sample_rate = models.FloatField(default=0.0, editable=False)
+
+    objects = CameraManager()
 
     def __str__(self):
         return self.name
@@ -27,6 +100,9 @@ class Camera(BaseModel):
     class Meta:
         verbose_name_plural = "Cameras"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["updated_at", "uuid"], name="camera_sync"),
+        ]
 
 
 class Event(BaseModel):
@@ -43,6 +119,210 @@ class Event(BaseModel):
     class Meta:
         verbose_name_plural = "Events"
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["camera", "timestamp"], name="event_camera_time"),
+            models.Index(fields=["timestamp"], name="event_time"),
+            models.Index(fields=["updated_at", "uuid"], name="event_sync"),
+        ]
+
+
+class Detection(models.Model):
+    # Narrow, append-only rows written in bulk by the analysis pipeline, so
+    # no BaseModel bookkeeping columns.
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="detections"
+    )
+    class_name = models.CharField(max_length=64)
+    confidence = models.FloatField()
+    x1 = models.FloatField()
+    y1 = models.FloatField()
+    x2 = models.FloatField()
+    y2 = models.FloatField()
+
+    def __str__(self):
+        return f"{self.class_name} ({self.confidence:.2f})"
+
+    class Meta:
+        verbose_name_plural = "Detections"
+        indexes = [
+            models.Index(
+                fields=["class_name", "confidence"], name="detection_class_conf"
+            ),
+        ]
+
+
+class AnalysisTaskManager(models.Manager):
+    def enqueue(self, events, priority=0):
+        """
+        Queue events for analysis, raising the priority of queued ones
+        """
+        events = list(events)
+        queued = set(self.filter(event__in=events).values_list("event_id", flat=True))
+        # Released as well so that a worker holding the old claim does not
+        # drop the re-queued task when it completes. `enqueued_at` is kept,
+        # queue lag counts from the first enqueue.
+        self.filter(event_id__in=queued, priority__lt=priority).update(
+            priority=priority,
+            claimed_at=None,
+            claimed_by=None,
+        )
+        self.bulk_create(
+            [
+                AnalysisTask(event=event, camera_id=event.camera_id, priority=priority)
+                for event in events
+                if event.pk not in queued
+            ]
+        )
+
+    def claim(self, size, timeout, cameras=None):
+        """
+        Claim up to `size` tasks: highest priority first, then round-robin
+        across cameras oldest first. Claims older than `timeout` are stale
+        and can be taken over. `cameras` restricts the claim to those camera
+        ids (e.g. the ones leased by this node).
+        """
+        now = timezone.now()
+        available = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timeout)
+        if cameras is not None:
+            available &= Q(camera_id__in=cameras)
+        ranked = (
+            self.filter(available)
+            .annotate(
+                turn=Window(
+                    RowNumber(),
+                    partition_by=[F("priority"), F("camera_id")],
+                    order_by=F("enqueued_at").asc(),
+                )
+            )
+            .order_by("-priority", "turn", "enqueued_at")
+        )
+        pks = [task.pk for task in ranked[:size]]
+
+        # Compare-and-set, a concurrent worker may have claimed some of them.
+        token = uuid.uuid4()
+        self.filter(available, pk__in=pks).update(claimed_at=now, claimed_by=token)
+        return list(
+            self.filter(claimed_by=token)
+            .select_related("event")
+            .order_by("-priority", "enqueued_at")
+        )
+
+    def lag(self):
+        """
+        Per-camera queue depth and oldest enqueue time
+        """
+        return (
+            self.values("camera_id")
+            .annotate(depth=Count("pk"), oldest=Min("enqueued_at"))
+            .order_by("oldest")
+        )
+
+
+class AnalysisTask(models.Model):
+    PRIORITY_NORMAL = 0
+    PRIORITY_RECHECK = 10
+
+    event = models.OneToOneField(
+        Event, on_delete=models.CASCADE, related_name="analysis_task"
+    )
+    # Denormalized from the event for per-camera fair scheduling.
+    camera = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="+")
+    priority = models.SmallIntegerField(default=PRIORITY_NORMAL)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.UUIDField(null=True, blank=True)
+
+    objects = AnalysisTaskManager()
+
+    def __str__(self):
+        return f"Analysis of {self.event_id} (priority {self.priority})"
+
+    class Meta:
+        verbose_name_plural = "Analysis tasks"
+        indexes = [
+            models.Index(fields=["priority", "enqueued_at"], name="task_priority"),
+            models.Index(fields=["camera", "enqueued_at"], name="task_camera"),
+            models.Index(fields=["claimed_by"], name="task_claim"),
+        ]
+
+
+class WorkerNode(models.Model):
+    # Capture/analysis process taking part in camera sharding, see
+    # ppe/sharding.py. A node is alive while its heartbeat is within the TTL.
+    name = models.CharField(max_length=255, primary_key=True)
+    heartbeat_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class CameraLeaseManager(models.Manager):
+    def renew(self, node, camera_ids, expires_at):
+        """
+        Extend the leases `node` holds on camera_ids, returns renewed count
+        """
+        return self.filter(node=node, camera_id__in=camera_ids).update(
+            expires_at=expires_at
+        )
+
+    def acquire(self, node, camera_ids, expires_at):
+        """
+        Take free or expired leases on camera_ids for `node`
+        """
+        now = timezone.now()
+        # Compare-and-set, only one node wins an expired lease.
+        self.filter(camera_id__in=camera_ids, expires_at__lt=now).exclude(
+            node=node
+        ).update(node=node, acquired_at=now, expires_at=expires_at)
+        leased = set(
+            self.filter(camera_id__in=camera_ids).values_list("camera_id", flat=True)
+        )
+        self.bulk_create(
+            [
+                CameraLease(
+                    camera_id=camera_id,
+                    node=node,
+                    acquired_at=now,
+                    expires_at=expires_at,
+                )
+                for camera_id in camera_ids
+                if camera_id not in leased
+            ],
+            ignore_conflicts=True,
+        )
+
+    def release(self, node, keep=()):
+        """
+        Drop the leases of `node` except those on `keep`
+        """
+        return self.filter(node=node).exclude(camera_id__in=keep).delete()[0]
+
+    def held(self, node):
+        return set(
+            self.filter(node=node, expires_at__gt=timezone.now()).values_list(
+                "camera_id", flat=True
+            )
+        )
+
+
+class CameraLease(models.Model):
+    camera = models.OneToOneField(
+        Camera, on_delete=models.CASCADE, primary_key=True, related_name="lease"
+    )
+    node = models.CharField(max_length=255)
+    acquired_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    objects = CameraLeaseManager()
+
+    def __str__(self):
+        return f"{self.camera_id} leased by {self.node}"
+
+    class Meta:
+        verbose_name_plural = "Camera leases"
+        indexes = [
+            models.Index(fields=["node", "expires_at"], name="lease_node"),
+        ]
 
 
 class Report(BaseModel):
@@ -0,0 +1,118 @@
+"""
+Per-camera regions of interest.
+
+`Camera.roi` holds a list of regions in frame-relative coordinates (0-1):
+a rectangle is `[x1, y1, x2, y2]`, a polygon is `[[x, y], [x, y], ...]`.
+Frames are cropped to the bounding box of every region (pixels outside a
+polygon are masked) so the detector only sees the parts of the scene that
+matter, and detections are mapped back to frame coordinates afterwards.
+"""
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from ppe.inference import Detection, non_max_suppression
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MASK_COLOR = (114, 114, 114)
+
+
+def is_rectangle(region) -> bool:
+    return len(region) == 4 and all(isinstance(v, (int, float)) for v in region)
+
+
+def region_box(region, width: int, height: int) -> tuple[int, int, int, int]:
+    """
+    Pixel bounding box of a region, clipped to the frame
+    """
+    if is_rectangle(region):
+        xs, ys = region[0::2], region[1::2]
+    else:
+        xs, ys = [p[0] for p in region], [p[1] for p in region]
+    x1 = max(int(min(xs) * width), 0)
+    y1 = max(int(min(ys) * height), 0)
+    x2 = min(round(max(xs) * width), width)
+    y2 = min(round(max(ys) * height), height)
+    return x1, y1, x2, y2
+
+
+def resize(image: "np.ndarray", scale: float) -> "np.ndarray":
+    import numpy as np
+    from PIL import Image
+
+    if scale == 1:
+        return image
+    height, width = image.shape[:2]
+    size = (max(round(width * scale), 1), max(round(height * scale), 1))
+    return np.asarray(Image.fromarray(image).resize(size, Image.BILINEAR))
+
+
+def crop_regions(frame: "np.ndarray", regions: Sequence, scale=1.0) -> list[tuple]:
+    """
+    Split frame into (crop, (left, top)) pairs, one per non-empty region,
+    every crop resized by `scale`
+
+    Crops are scaled like the whole frame would be, so a region costs the
+    detector no more than its share of the frame. Without regions, or when
+    none of them is usable, the whole frame is returned as a single crop.
+    """
+    if not regions:
+        return [(resize(frame, scale), (0, 0))]
+
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    height, width = frame.shape[:2]
+    crops = []
+    for region in regions:
+        x1, y1, x2, y2 = region_box(region, width, height)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        crop = frame[y1:y2, x1:x2]
+        if not is_rectangle(region):
+            mask = Image.new("1", (x2 - x1, y2 - y1), 0)
+            polygon = [(p[0] * width - x1, p[1] * height - y1) for p in region]
+            ImageDraw.Draw(mask).polygon(polygon, fill=1)
+            crop = np.where(np.asarray(mask)[..., None], crop, MASK_COLOR)
+            crop = crop.astype(np.uint8)
+        crops.append((np.ascontiguousarray(resize(crop, scale)), (x1, y1)))
+    return crops or [(resize(frame, scale), (0, 0))]
+
+
+def merge_detections(results: Sequence[list[Detection]], offsets, iou=0.45, scale=1.0):
+    """
+    Map per-crop detections back into frame coordinates: undo the crop
+    `scale`, then shift by the crop offset
+
+    Overlapping regions can see the same object twice, so the merged
+    detections go through NMS again.
+    """
+    import numpy as np
+
+    detections = [
+        Detection(
+            xyxy=(
+                d.xyxy[0] / scale + left,
+                d.xyxy[1] / scale + top,
+                d.xyxy[2] / scale + left,
+                d.xyxy[3] / scale + top,
+            ),
+            confidence=d.confidence,
+            class_id=d.class_id,
+            name=d.name,
+        )
+        for crop_detections, (left, top) in zip(results, offsets)
+        for d in crop_detections
+    ]
+    if len(offsets) < 2 or not detections:
+        return detections
+
+    keep = non_max_suppression(
+        np.array([d.xyxy for d in detections]),
+        np.array([d.confidence for d in detections]),
+        np.array([d.class_id for d in detections]),
+        iou,
+    )
+    return [detections[i] for i in sorted(keep)]
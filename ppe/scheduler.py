@@ -0,0 +1,121 @@
+"""
+Adaptive per-camera sampling.
+
+Every active camera carries a sampling weight. A camera whose recent events
+show activity (detections or violations) doubles its weight, a static one
+halves it, within [1, `max_weight`]. The global frames-per-second budget is
+then split across active cameras in proportion to their weights, with every
+camera kept between the configured minimum and maximum rate.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from ppe.models import Camera, Detection, Event
+
+
+def allocate(weights: dict, budget: float, min_rate: float, max_rate: float):
+    """
+    Split `budget` proportionally to `weights` with per-camera bounds
+    """
+    if not weights:
+        return {}
+
+    # Reserve the floor of every camera first, so it never pushes the total
+    # over the budget, then share out the rest within `max_rate`.
+    floor = min(min_rate, budget / len(weights))
+    cap = max(max_rate - floor, 0)
+    shares, remaining, left = {}, dict(weights), budget - floor * len(weights)
+    while remaining:
+        total = sum(remaining.values())
+        capped = [k for k, w in remaining.items() if left * w / total > cap]
+        if not capped:
+            shares.update({k: left * w / total for k, w in remaining.items()})
+            break
+        for k in capped:
+            shares[k] = cap
+            left -= cap
+            del remaining[k]
+
+    return {k: floor + share for k, share in shares.items()}
+
+
+class SamplingScheduler:
+    def __init__(
+        self,
+        budget=10.0,
+        min_rate=0.1,
+        max_rate=5.0,
+        window=timedelta(seconds=60),
+        boost=2.0,
+        backoff=0.5,
+        max_weight=64.0,
+    ):
+        self.budget = budget
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.window = window
+        self.boost = boost
+        self.backoff = backoff
+        self.max_weight = max_weight
+
+    def activity(self, camera_ids):
+        """
+        Camera ids whose events in the window show detections or violations
+        """
+        has_detections = Exists(Detection.objects.filter(event=OuterRef("pk")))
+        rows = (
+            Event.objects.filter(
+                camera_id__in=camera_ids,
+                timestamp__gte=timezone.now() - self.window,
+            )
+            .values("camera_id")
+            .annotate(
+                active=Count("pk", filter=Q(is_violation=True) | Q(has_detections))
+            )
+            .order_by()
+        )
+        return {row["camera_id"] for row in rows if row["active"]}
+
+    def step(self):
+        """
+        Recompute weights and rates of all active cameras, returns the rates
+        """
+        cameras = list(
+            Camera.objects.filter(is_active=True).only("pk", "sample_weight")
+        )
+        active = self.activity([camera.pk for camera in cameras])
+
+        weights = {}
+        for camera in cameras:
+            factor = self.boost if camera.pk in active else self.backoff
+            weights[camera.pk] = min(
+                max(camera.sample_weight * factor, 1.0), self.max_weight
+            )
+
+        rates = allocate(weights, self.budget, self.min_rate, self.max_rate)
+        for camera in cameras:
+            camera.sample_weight = weights[camera.pk]
+            camera.sample_rate = rates[camera.pk]
+        # Scheduling state only, deliberately leaves updated_at alone.
+        Camera.objects.bulk_update(cameras, ["sample_weight", "sample_rate"])
+        Camera.objects.filter(is_active=False).exclude(sample_rate=0).update(
+            sample_rate=0
+        )
+        return rates
+
+
+def get_scheduler() -> SamplingScheduler:
+    """
+    Scheduler configured by the PPE_SAMPLING_* settings
+    """
+    from django.conf import settings
+
+    return SamplingScheduler(
+        budget=settings.PPE_SAMPLING_BUDGET_FPS,
+        min_rate=settings.PPE_SAMPLING_MIN_FPS,
+        max_rate=settings.PPE_SAMPLING_MAX_FPS,
+        window=timedelta(seconds=settings.PPE_SAMPLING_WINDOW),
+    )
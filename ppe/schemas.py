@@ -1,10 +1,20 @@
+from datetime import datetime
 from ninja import ModelSchema, Field, Schema
-from typing import Optional
+from pydantic import confloat, conlist
+from typing import List, Optional
+from uuid import UUID
 
-from ppe.models import Camera, Event, Report
+from ppe.models import Camera, Detection, Event, Report
+
+Coordinate = confloat(ge=0, le=1)
+Rectangle = conlist(Coordinate, min_length=4, max_length=4)
+Polygon = conlist(conlist(Coordinate, min_length=2, max_length=2), min_length=3)
+Region = Rectangle | Polygon
 
 
 class CameraSchemaOut(ModelSchema):
+    roi: List[Region]
+
     class Meta:
         model = Camera
         fields = [
@@ -12,12 +22,27 @@ class CameraSchemaOut(ModelSchema):
             "name",
             "rtsp_url",
             "is_active",
+            "roi",
+            "event_count",
+            "violation_count",
+            "sample_rate",
             "created_at",
             "updated_at",
         ]
 
 
+class CameraRateSchemaOut(ModelSchema):
+    class Meta:
+        model = Camera
+        fields = [
+            "uuid",
+            "sample_rate",
+        ]
+
+
 class CameraSchemaIn(ModelSchema):
+    roi: List[Region] = Field([], description="Frame-relative (0-1) regions")
+
     class Meta:
         model = Camera
         fields = [
@@ -31,6 +56,7 @@ class CameraSchemaUpdate(Schema):
     name: Optional[str] = None
     rtsp_url: Optional[str] = None
     is_active: Optional[bool] = None
+    roi: Optional[List[Region]] = None
 
 
 class EventSchemaOut(ModelSchema):
@@ -49,6 +75,28 @@ class EventSchemaOut(ModelSchema):
         ]
 
 
+class EventSparseSchemaOut(ModelSchema):
+    """
+    Event with every field optional: sparse fieldsets (`fields`) and
+    buffered events, whose timestamps are set when they are written
+    """
+
+    class Meta:
+        model = Event
+        fields = EventSchemaOut.Meta.fields
+        fields_optional = "__all__"
+
+    @staticmethod
+    def resolve_image(obj):
+        # Sparse fieldsets are served from `.values()` rows, where the image
+        # is a bare storage name rather than a FieldFile.
+        if isinstance(obj, dict):
+            if "image" not in obj:
+                raise AttributeError("image")
+            return obj["image"] and Event.image.field.storage.url(obj["image"])
+        return obj.image
+
+
 class EventSchemaIn(ModelSchema):
     camera_id: str = Field(..., description="Camera UUID")
 
@@ -68,6 +116,86 @@ class EventSchemaUpdate(Schema):
     violation_type: Optional[str] = ""
 
 
+class EventFilterSchema(Schema):
+    camera_uuid: Optional[UUID] = None
+    is_violation: Optional[bool] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    detection_class: Optional[str] = None
+    min_confidence: Optional[float] = None
+
+
+class EventBulkSchemaDelete(Schema):
+    uuids: Optional[List[UUID]] = Field(None, description="Event UUIDs")
+    filters: Optional[EventFilterSchema] = Field(
+        None, description="Same filters as the event list"
+    )
+
+
+class EventBulkSchemaUpdate(EventBulkSchemaDelete):
+    data: EventSchemaUpdate
+
+
+class BulkSchemaOut(Schema):
+    count: int
+
+
+class DetectionSchemaOut(ModelSchema):
+    class Meta:
+        model = Detection
+        fields = [
+            "event",
+            "class_name",
+            "confidence",
+            "x1",
+            "y1",
+            "x2",
+            "y2",
+        ]
+
+
+class QueueCameraSchemaOut(Schema):
+    camera: UUID = Field(..., alias="camera_id")
+    depth: int
+    oldest_age: float = Field(..., description="Seconds the oldest task waits")
+
+
+class QueueSchemaOut(Schema):
+    depth: int
+    cameras: List[QueueCameraSchemaOut]
+
+
+class CameraSyncSchemaOut(CameraSchemaOut):
+    is_deleted: bool
+
+
+class EventSyncSchemaOut(EventSchemaOut):
+    is_deleted: bool
+
+
+class CameraChangesSchemaOut(Schema):
+    items: List[CameraSyncSchemaOut]
+    cursor: str = Field(..., description="Pass as `since` to get the next changes")
+    has_more: bool
+
+
+class EventChangesSchemaOut(Schema):
+    items: List[EventSyncSchemaOut]
+    cursor: str = Field(..., description="Pass as `since` to get the next changes")
+    has_more: bool
+
+
+class TimeseriesPointSchemaOut(Schema):
+    time: datetime = Field(..., description="Start of the bin")
+    events: int
+    violations: int
+
+
+class TimeseriesSchemaOut(Schema):
+    step: int = Field(..., description="Bin width in seconds")
+    points: List[TimeseriesPointSchemaOut]
+
+
 class ReportSchemaOut(ModelSchema):
     class Meta:
         model = Report
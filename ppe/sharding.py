@@ -0,0 +1,91 @@
+"""
+Camera sharding across capture/analysis nodes through database leases.
+
+Every node heartbeats into `WorkerNode` and computes the same assignment
+from the set of live nodes with rendezvous (highest random weight) hashing:
+cameras spread evenly and only the cameras of a joining or leaving node move.
+A node then renews the leases of its cameras, releases the ones that now
+belong to someone else and takes over free or expired leases. A node that
+dies stops heartbeating and renewing, so its cameras are picked up by the
+others within the lease TTL (plus one renew interval).
+"""
+
+import hashlib
+import os
+import socket
+from collections.abc import Iterable
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ppe.models import Camera, CameraLease, WorkerNode
+
+
+def default_node_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def rendezvous_owner(camera_id, nodes: Iterable[str]) -> str:
+    """
+    Node with the highest hash weight for camera_id
+    """
+    return max(
+        nodes,
+        key=lambda node: hashlib.blake2b(
+            f"{node}:{camera_id}".encode(), digest_size=8
+        ).digest(),
+    )
+
+
+class Shard:
+    def __init__(self, node=None, ttl=timedelta(seconds=30)):
+        self.node = node or default_node_name()
+        self.ttl = ttl
+
+    def live_nodes(self) -> set[str]:
+        cutoff = timezone.now() - self.ttl
+        return set(
+            WorkerNode.objects.filter(heartbeat_at__gte=cutoff).values_list(
+                "name", flat=True
+            )
+        )
+
+    def assignment(self) -> set:
+        """
+        Active camera ids this node should hold given the live nodes
+        """
+        nodes = self.live_nodes() | {self.node}
+        cameras = Camera.objects.filter(is_active=True).values_list("pk", flat=True)
+        return {pk for pk in cameras if rendezvous_owner(pk, nodes) == self.node}
+
+    def step(self) -> set:
+        """
+        Heartbeat, rebalance and renew leases, returns the camera ids held
+        """
+        now = timezone.now()
+        WorkerNode.objects.update_or_create(
+            name=self.node, defaults={"heartbeat_at": now}
+        )
+        WorkerNode.objects.filter(heartbeat_at__lt=now - 10 * self.ttl).delete()
+        mine = self.assignment()
+        expires_at = now + self.ttl
+        CameraLease.objects.release(self.node, keep=mine)
+        CameraLease.objects.renew(self.node, mine, expires_at)
+        CameraLease.objects.acquire(self.node, mine, expires_at)
+        return CameraLease.objects.held(self.node)
+
+    def leave(self):
+        """
+        Hand the cameras over right away on a graceful shutdown
+        """
+        CameraLease.objects.release(self.node)
+        WorkerNode.objects.filter(name=self.node).delete()
+
+
+def get_shard(node=None) -> Shard:
+    """
+    Shard configured by the PPE_LEASE_* settings
+    """
+    from django.conf import settings
+
+    return Shard(node=node, ttl=timedelta(seconds=settings.PPE_LEASE_TTL))
@@ -0,0 +1,129 @@
+"""
+Bucketed event counts for charts.
+
+The range is split into bins of a "nice" step chosen so that at most
+`points` bins are returned. Counts are aggregated in the database per
+minute, hour or day (the largest unit dividing the step) and folded into
+epoch-aligned bins here, which is what `date_bin` does on PostgreSQL but
+works on every backend. Optionally the series is computed at a finer step
+and thinned back to `points` with Largest-Triangle-Three-Buckets, keeping
+short violation spikes visible.
+"""
+
+import math
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+
+from django.db.models import Count, Q, QuerySet
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+
+from ppe import archive
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+STEPS = [
+    MINUTE,
+    5 * MINUTE,
+    15 * MINUTE,
+    30 * MINUTE,
+    HOUR,
+    3 * HOUR,
+    6 * HOUR,
+    12 * HOUR,
+    DAY,
+    7 * DAY,
+]
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+# Bins computed per returned point when downsampling with LTTB
+LTTB_FACTOR = 4
+
+
+def choose_step(start: datetime, end: datetime, points: int) -> int:
+    """
+    Smallest nice step in seconds giving at most `points` bins over the range
+    """
+    # One bin less than asked for, aligning the first bin can add one.
+    needed = math.ceil((end - start).total_seconds() / max(points - 1, 1))
+    for step in STEPS:
+        if step >= needed:
+            return step
+    return math.ceil(needed / DAY) * DAY
+
+
+def truncate(step: int):
+    if step % DAY == 0:
+        return TruncDay
+    if step % HOUR == 0:
+        return TruncHour
+    return TruncMinute
+
+
+def bin_start(value: datetime, step: int) -> datetime:
+    seconds = (value - EPOCH).total_seconds()
+    return EPOCH + timedelta(seconds=seconds // step * step)
+
+
+def bucket_counts(
+    queryset: QuerySet, start: datetime, end: datetime, step: int, camera_id=None
+):
+    """
+    Zero-filled [{"time", "events", "violations"}] bins of `step` seconds
+
+    Archived events (of `camera_id`, or all cameras) are counted as well.
+    """
+    trunc = truncate(step)
+    rows = (
+        queryset.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(unit=trunc("timestamp", tzinfo=UTC))
+        .values("unit")
+        .annotate(
+            events=Count("pk"),
+            violations=Count("pk", filter=Q(is_violation=True)),
+        )
+        .order_by()
+    )
+
+    first = bin_start(start, step)
+    count = math.ceil((end - first).total_seconds() / step)
+    bins = [
+        {"time": first + timedelta(seconds=i * step), "events": 0, "violations": 0}
+        for i in range(count)
+    ]
+    for row in rows:
+        index = int((row["unit"] - first).total_seconds() // step)
+        bins[index]["events"] += row["events"]
+        bins[index]["violations"] += row["violations"]
+    for row in archive.iter_rows(["is_violation"], start, end, camera_id):
+        index = int((row["timestamp"] - first).total_seconds() // step)
+        bins[index]["events"] += 1
+        bins[index]["violations"] += row["is_violation"]
+    return bins
+
+
+def lttb(points: Sequence[dict], threshold: int, key: str) -> list[dict]:
+    """
+    Largest-Triangle-Three-Buckets: keep `threshold` points of the series
+    `key` that best preserve its visual shape, first and last included
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    xs = [p["time"].timestamp() for p in points]
+    ys = [p[key] for p in points]
+    size = (len(points) - 2) / (threshold - 2)
+    selected, a = [points[0]], 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * size) + 1, int((i + 1) * size) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * size) + 1, len(points))
+        avg_x = sum(xs[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(ys[next_lo:next_hi]) / (next_hi - next_lo)
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs(
+                (xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(points[best])
+        a = best
+    selected.append(points[-1])
+    return selected
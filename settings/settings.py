@@ -146,6 +146,69 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Event analysis, see ppe/inference.py for the available backends
+PPE_INFERENCE_BACKEND = os.getenv("PPE_INFERENCE_BACKEND", "pytorch")
+PPE_INFERENCE_WEIGHTS = os.getenv("PPE_INFERENCE_WEIGHTS", "yolov5s.pt")
+PPE_INFERENCE_SIZE = int(os.getenv("PPE_INFERENCE_SIZE", "640"))
+PPE_INFERENCE_CONFIDENCE = float(os.getenv("PPE_INFERENCE_CONFIDENCE", "0.25"))
+PPE_VIOLATION_CLASSES = os.getenv(
+    "PPE_VIOLATION_CLASSES", "no_helmet,no_vest,no_mask"
+).split(",")
+
+# Seconds before a claimed analysis task is handed to another worker
+PPE_ANALYSIS_CLAIM_TIMEOUT = int(os.getenv("PPE_ANALYSIS_CLAIM_TIMEOUT", "300"))
+
+# Seconds a camera lease lasts without renewal, i.e. the failover time when
+# a node dies (see ppe/sharding.py)
+PPE_LEASE_TTL = int(os.getenv("PPE_LEASE_TTL", "30"))
+
+# Detection result cache, 0 disables it. Setting a Hamming distance (0-64)
+# reuses results for perceptually near-identical frames of the same camera.
+PPE_RESULT_CACHE_SIZE = int(os.getenv("PPE_RESULT_CACHE_SIZE", "1024"))
+PPE_RESULT_CACHE_DIR = os.getenv("PPE_RESULT_CACHE_DIR")
+PPE_RESULT_CACHE_DISK_SIZE = int(os.getenv("PPE_RESULT_CACHE_DISK_SIZE", "100000"))
+PPE_RESULT_CACHE_PERCEPTUAL_DISTANCE = (
+    int(os.getenv("PPE_RESULT_CACHE_PERCEPTUAL_DISTANCE"))
+    if os.getenv("PPE_RESULT_CACHE_PERCEPTUAL_DISTANCE")
+    else None
+)
+
+# Write-behind buffer for POST /events, 0 inserts every event on its own.
+# Events are written every BATCH events or DELAY_MS milliseconds, a full
+# buffer makes requests wait up to TIMEOUT seconds before answering 503.
+PPE_EVENT_BUFFER_SIZE = int(os.getenv("PPE_EVENT_BUFFER_SIZE", "0"))
+PPE_EVENT_BUFFER_BATCH = int(os.getenv("PPE_EVENT_BUFFER_BATCH", "500"))
+PPE_EVENT_BUFFER_DELAY_MS = int(os.getenv("PPE_EVENT_BUFFER_DELAY_MS", "50"))
+PPE_EVENT_BUFFER_TIMEOUT = float(os.getenv("PPE_EVENT_BUFFER_TIMEOUT", "1"))
+
+# Event image storage, defaults to the project directory.
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", str(BASE_DIR))
+
+# Event image serving. Set ACCEL_PREFIX to an nginx `internal` location
+# aliased to MEDIA_ROOT (X-Accel-Redirect), or SENDFILE for X-Sendfile.
+# `?w=` is rounded up to one of WIDTHS, resized copies are kept in CACHE_DIR
+# (MEDIA_ROOT/.resized by default) up to CACHE_MB megabytes.
+PPE_MEDIA_ACCEL_PREFIX = os.getenv("PPE_MEDIA_ACCEL_PREFIX", "")
+PPE_MEDIA_SENDFILE = os.getenv("PPE_MEDIA_SENDFILE", "False").lower() == "true"
+PPE_MEDIA_WIDTHS = [
+    int(w) for w in os.getenv("PPE_MEDIA_WIDTHS", "160,320,640,1280").split(",")
+]
+PPE_MEDIA_CACHE_DIR = os.getenv("PPE_MEDIA_CACHE_DIR")
+PPE_MEDIA_CACHE_MB = int(os.getenv("PPE_MEDIA_CACHE_MB", "1024"))
+
+# Date-partitioned columnar files of archived events, see ppe/archive.py
+PPE_ARCHIVE_DIR = os.getenv("PPE_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+
+# Seconds the changes feeds stay behind now, longer than any write
+# transaction so that no change is committed behind a handed out cursor
+PPE_SYNC_LAG = int(os.getenv("PPE_SYNC_LAG", "5"))
+
+# Adaptive sampling, global frames per second split across active cameras
+PPE_SAMPLING_BUDGET_FPS = float(os.getenv("PPE_SAMPLING_BUDGET_FPS", "10"))
+PPE_SAMPLING_MIN_FPS = float(os.getenv("PPE_SAMPLING_MIN_FPS", "0.1"))
+PPE_SAMPLING_MAX_FPS = float(os.getenv("PPE_SAMPLING_MAX_FPS", "5"))
+PPE_SAMPLING_WINDOW = int(os.getenv("PPE_SAMPLING_WINDOW", "60"))
+
 # https://docs.djangoproject.com/en/4.0/topics/logging/
 LOGGING = {
     "version": 1,
@@ -1,5 +1,34 @@
-from django.test import TestCase
-from ppe.models import Camera, Event, Report
+import subprocess
+import sys
+import tempfile
+from datetime import UTC, datetime, timedelta
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from uuid import RFC_4122, uuid4
+
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from ppe import archive
+from ppe.api import EventAPI
+from ppe.cache import ResultCache
+from ppe.framebuffer import FrameRing
+from ppe.inference import HEAVY_MODULES, Detection, Detector
+from ppe.ingest import EventBuffer
+from ppe.media import get_derivative_cache
+from ppe.models import AnalysisTask, Camera, CameraLease, Event, Report, WorkerNode
+from ppe.models import uuid7
+from ppe.models import Detection as DetectionRow
+from ppe.scheduler import SamplingScheduler, allocate
+from ppe.sharding import Shard
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
 
 class TestCameraAPI(TestCase):
@@ -85,6 +114,23 @@ class TestCameraAPI(TestCase):
         self.assertEqual(response.json()["rtsp_url"], camera.rtsp_url)
         self.assertEqual(response.json()["is_active"], camera.is_active)
 
+    def test_camera_roi(self):
+        endpoint = "/api/v1/ppe/cameras"
+        payload = {
+            "name": "Test Camera",
+            "rtsp_url": "rtsp://test.com",
+            "roi": [[0, 0, 0.5, 0.5], [[0.5, 0.5], [1, 0.5], [1, 1]]],
+        }
+        response = self.client.post(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["roi"], payload["roi"])
+
+        payload["roi"] = [[0, 0, 2, 0.5]]
+        response = self.client.post(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 422)
+
     def test_camera_delete(self):
         camera = Camera.objects.create(
             name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
@@ -119,6 +165,21 @@ class TestEventAPI(TestCase):
         self.assertEqual(response.json()["is_violation"], payload["is_violation"])
         self.assertEqual(response.json()["violation_type"], payload["violation_type"])
 
+    def test_event_create_unknown_camera(self):
+        deleted = Camera.objects.create(name="Deleted", rtsp_url="rtsp://test.com")
+        self.client.delete(f"/api/v1/ppe/cameras/{deleted.uuid}")
+        endpoint = "/api/v1/ppe/events"
+        for camera_id in [str(uuid4()), "nope", str(deleted.uuid)]:
+            payload = {"camera_id": camera_id, "image": "/test.jpg"}
+            response = self.client.post(
+                endpoint, payload, content_type="application/json"
+            )
+
+            self.assertEqual(response.status_code, 404)
+        self.assertFalse(Event.all_objects.exists())
+        deleted.refresh_from_db()
+        self.assertEqual(deleted.event_count, 0)
+
     def test_event_list(self):
         endpoint = "/api/v1/ppe/events"
         response = self.client.get(endpoint)
@@ -276,3 +337,1309 @@ class TestReportAPI(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(Report.objects.count(), 0)
+
+
+class TestEventSparseFields(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.event = Event.objects.create(
+            camera=self.camera,
+            image="test.jpg",
+            is_violation=True,
+            violation_type="no_helmet",
+        )
+
+    def test_event_list_fields(self):
+        endpoint = "/api/v1/ppe/events?fields=uuid,timestamp,violation_type"
+        response = self.client.get(endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        items = response.json()["items"]
+        self.assertEqual(set(items[0].keys()), {"uuid", "timestamp", "violation_type"})
+        self.assertEqual(items[0]["uuid"], str(self.event.uuid))
+        self.assertEqual(items[0]["violation_type"], self.event.violation_type)
+
+    def test_event_retrieve_fields(self):
+        endpoint = f"/api/v1/ppe/events/{self.event.uuid}?fields=camera,image"
+        response = self.client.get(endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"camera": str(self.camera.uuid), "image": self.event.image.url},
+        )
+
+    def test_full_event_schema(self):
+        schemas = self.client.get("/api/v1/openapi.json").json()["components"]
+        required = schemas["schemas"]["EventSchemaOut"]["required"]
+
+        self.assertIn("camera", required)
+        self.assertIn("timestamp", required)
+
+    def test_event_unknown_fields(self):
+        endpoint = "/api/v1/ppe/events?fields=uuid,rtsp_url"
+        response = self.client.get(endpoint)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestEventBulkAPI(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.other_camera = Camera.objects.create(
+            name="Other Camera", rtsp_url="rtsp://other.com", is_active=True
+        )
+        self.events = Event.objects.bulk_create(
+            [Event(camera=self.camera, image="test.jpg") for i in range(5)]
+            + [Event(camera=self.other_camera, image="test.jpg") for i in range(3)]
+        )
+
+    def test_event_bulk_update_uuids(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {
+            "uuids": [str(event.uuid) for event in self.events[:2]],
+            "data": {"is_analyzed": True},
+        }
+        response = self.client.patch(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(Event.objects.filter(is_analyzed=True).count(), 2)
+
+    def test_event_bulk_update_filters(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {
+            "filters": {"camera_uuid": str(self.camera.uuid)},
+            "data": {"is_analyzed": True, "is_violation": True},
+        }
+        response = self.client.patch(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 5)
+        self.assertEqual(
+            Event.objects.filter(camera=self.camera, is_violation=True).count(), 5
+        )
+        self.assertEqual(
+            Event.objects.filter(camera=self.other_camera, is_analyzed=True).count(),
+            0,
+        )
+
+    def test_event_bulk_update_chunks(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {
+            "uuids": [str(event.uuid) for event in self.events],
+            "data": {"is_analyzed": True},
+        }
+
+        with mock.patch.object(EventAPI, "bulk_chunk_size", 3):
+            response = self.client.patch(
+                endpoint, payload, content_type="application/json"
+            )
+
+        self.assertEqual(response.json()["count"], len(self.events))
+        self.assertEqual(Event.objects.filter(is_analyzed=False).count(), 0)
+
+    def test_event_bulk_update_validates(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {
+            "uuids": [str(event.uuid) for event in self.events],
+            "data": {"violation_type": None},
+        }
+        response = self.client.patch(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Event.objects.filter(violation_type__isnull=True).exists())
+
+    def test_event_bulk_rejects_bad_payload(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {"filters": {"camera_uuid": "nope"}, "data": {"is_analyzed": True}}
+        for method in (self.client.patch, self.client.delete):
+            response = method(endpoint, payload, content_type="application/json")
+            self.assertEqual(response.status_code, 422)
+
+        payload = {"uuids": [str(self.events[0].uuid)], "data": {}}
+        response = self.client.patch(endpoint, payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Event.objects.count(), len(self.events))
+
+    def test_event_bulk_requires_target(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        for payload in (
+            {},
+            {"filters": {}},
+            {"filters": {"camera_uuid": None, "is_violation": None}},
+            {"uuids": []},
+        ):
+            response = self.client.delete(
+                endpoint, payload, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Event.objects.count(), len(self.events))
+
+    def test_event_bulk_delete(self):
+        endpoint = "/api/v1/ppe/events/bulk"
+        payload = {"filters": {"camera_uuid": str(self.other_camera.uuid)}}
+        response = self.client.delete(
+            endpoint, payload, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual(Event.objects.count(), 5)
+
+
+class TestConditionalUpdate(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.event = Event.objects.create(camera=self.camera, image="test.jpg")
+        self.endpoint = f"/api/v1/ppe/events/{self.event.uuid}"
+
+    def test_event_retrieve_etag(self):
+        response = self.client.get(self.endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"{self.event.updated_at.isoformat()}"')
+
+    def test_event_update_if_match(self):
+        etag = self.client.get(self.endpoint)["ETag"]
+        response = self.client.put(
+            self.endpoint,
+            {"is_analyzed": True},
+            content_type="application/json",
+            headers={"If-Match": etag},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["is_analyzed"])
+        self.assertNotEqual(response["ETag"], etag)
+
+        event = Event.objects.get(uuid=self.event.uuid)
+        self.assertTrue(event.is_analyzed)
+        self.assertEqual(response["ETag"], f'"{event.updated_at.isoformat()}"')
+
+    def test_event_update_stale_if_match(self):
+        etag = self.client.get(self.endpoint)["ETag"]
+        self.client.put(
+            self.endpoint, {"is_violation": True}, content_type="application/json"
+        )
+        response = self.client.put(
+            self.endpoint,
+            {"is_violation": False},
+            content_type="application/json",
+            headers={"If-Match": etag},
+        )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertTrue(Event.objects.get(uuid=self.event.uuid).is_violation)
+
+    def test_event_update_invalid(self):
+        response = self.client.put(
+            self.endpoint,
+            {"violation_type": "x" * 256},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_report_update(self):
+        report = Report.objects.create(report_data={"test": "data"})
+        endpoint = f"/api/v1/ppe/reports/{report.uuid}"
+        response = self.client.put(
+            endpoint,
+            {"report_data": {"test": "updated"}},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["report_data"], {"test": "updated"})
+
+    def test_update_missing(self):
+        endpoint = f"/api/v1/ppe/cameras/{self.event.uuid}"
+        response = self.client.put(
+            endpoint, {"name": "Missing"}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class TestCameraCounters(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+
+    def create_event(self, **kwargs):
+        payload = {"camera_id": str(self.camera.uuid), "image": "test.jpg", **kwargs}
+        response = self.client.post(
+            "/api/v1/ppe/events", payload, content_type="application/json"
+        )
+        return response.json()["uuid"]
+
+    def assertCounts(self, events, violations):
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.event_count, events)
+        self.assertEqual(self.camera.violation_count, violations)
+
+    def test_counters_create_update_delete(self):
+        uuid = self.create_event(is_violation=True)
+        self.create_event()
+        self.assertCounts(2, 1)
+
+        endpoint = f"/api/v1/ppe/events/{uuid}"
+        self.client.put(
+            endpoint, {"is_violation": False}, content_type="application/json"
+        )
+        self.assertCounts(2, 0)
+
+        self.client.put(
+            endpoint, {"is_violation": True}, content_type="application/json"
+        )
+        self.client.put(
+            endpoint, {"is_violation": True}, content_type="application/json"
+        )
+        self.assertCounts(2, 1)
+
+        self.client.delete(endpoint)
+        self.assertCounts(1, 0)
+
+        response = self.client.get(f"/api/v1/ppe/cameras/{self.camera.uuid}")
+        self.assertEqual(response.json()["event_count"], 1)
+        self.assertEqual(response.json()["violation_count"], 0)
+
+    def test_counters_bulk(self):
+        for i in range(4):
+            self.create_event()
+
+        endpoint = "/api/v1/ppe/events/bulk"
+        filters = {"camera_uuid": str(self.camera.uuid)}
+        self.client.patch(
+            endpoint,
+            {"filters": filters, "data": {"is_violation": True}},
+            content_type="application/json",
+        )
+        self.assertCounts(4, 4)
+
+        self.client.delete(
+            endpoint,
+            {"filters": {**filters, "is_violation": True}},
+            content_type="application/json",
+        )
+        self.assertCounts(0, 0)
+
+    def test_recount(self):
+        Event.objects.bulk_create(
+            [
+                Event(camera=self.camera, image="test.jpg", is_violation=i % 2 == 0)
+                for i in range(5)
+            ]
+        )
+        self.assertCounts(0, 0)
+
+        call_command("recount", batch_size=1, stdout=StringIO())
+        self.assertCounts(5, 3)
+
+
+class FakeDetector(Detector):
+    def __init__(self, names):
+        super().__init__("fake.pt")
+        self.names = dict(enumerate(names))
+        self.frames = 0
+        self.shapes = []
+
+    def detect(self, images):
+        self.frames += len(images)
+        self.shapes.extend(image.shape for image in images)
+        return [
+            [
+                Detection((0, 0, 10, 10), 0.9, class_id, name)
+                for class_id, name in self.names.items()
+            ]
+            for image in images
+        ]
+
+
+def create_image(name, size=(64, 48), color=(255, 0, 0)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG")
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+@skipUnless(find_spec("numpy"), "inference stack is not installed")
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestAnalysis(TestCase):
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.events = [
+            Event.objects.create(
+                camera=self.camera, image=create_image("test.jpg", color=(i, 0, 0))
+            )
+            for i in range(3)
+        ]
+        Camera.objects.add_counts(events={self.camera.pk: len(self.events)})
+
+    def test_analyze_events(self):
+        from ppe.analysis import analyze_events
+
+        detector = FakeDetector(["person", "no_helmet"])
+        count = analyze_events(self.events, detector=detector, batch_size=2)
+
+        self.assertEqual(count, 3)
+        self.assertEqual(detector.frames, 3)
+        for event in Event.objects.all():
+            self.assertTrue(event.is_analyzed)
+            self.assertTrue(event.is_violation)
+            self.assertEqual(event.violation_type, "no_helmet")
+
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.violation_count, 3)
+        self.assertEqual(DetectionRow.objects.count(), 6)
+        self.assertEqual(DetectionRow.objects.filter(class_name="no_helmet").count(), 3)
+
+        analyze_events(self.events, detector=FakeDetector(["person"]))
+        self.assertEqual(DetectionRow.objects.count(), 3)
+
+    def test_analyze_events_clean(self):
+        from ppe.analysis import analyze_events
+
+        analyze_events(self.events, detector=FakeDetector(["person"]))
+
+        self.assertFalse(Event.objects.filter(is_violation=True).exists())
+        self.assertEqual(Event.objects.filter(is_analyzed=True).count(), 3)
+
+    def test_analyze_events_cache(self):
+        from ppe.analysis import analyze_events
+
+        duplicate = Event.objects.create(
+            camera=self.camera, image=create_image("test.jpg", color=(0, 0, 0))
+        )
+        detector = FakeDetector(["no_helmet"])
+        cache = ResultCache(max_entries=2)
+        analyze_events(self.events, detector=detector, cache=cache)
+        analyze_events([duplicate], detector=detector, cache=cache)
+
+        self.assertEqual(detector.frames, 3)
+        self.assertEqual(cache.hits["memory"], 1)
+        self.assertEqual(cache.misses, 3)
+        self.assertTrue(Event.objects.get(pk=duplicate.pk).is_violation)
+
+    def test_analyze_events_roi(self):
+        from ppe.analysis import analyze_events
+
+        self.camera.roi = [[0.5, 0, 1, 0.5], [[0, 0.5], [0.5, 0.5], [0.25, 1]]]
+        self.camera.save()
+        detector = FakeDetector(["no_helmet"])
+        analyze_events(self.events[:1], detector=detector)
+
+        self.assertEqual(detector.shapes, [(24, 32, 3), (24, 32, 3)])
+        boxes = DetectionRow.objects.values_list("x1", "y1", "x2", "y2")
+        self.assertEqual(sorted(boxes), [(0, 24, 10, 34), (32, 0, 42, 10)])
+
+    def test_detect_frames_roi_pixels(self):
+        import numpy as np
+
+        from ppe.analysis import detect_frames
+
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+        def pixels(regions):
+            detector = FakeDetector(["no_helmet"])
+            results = detect_frames(detector, [frame], [regions])
+            shapes = [detector.batch_shape(np.zeros(s)) for s in detector.shapes]
+            return sum(h * w for h, w in shapes), results[0]
+
+        full, _ = pixels([])
+        self.assertEqual(full, 384 * 640)
+        for regions in [
+            [[0, 0, 0.5, 1]],
+            [[0, 0, 0.5, 1], [0.5, 0, 1, 1]],
+            [[0.4, 0.4, 0.6, 0.6]],
+        ]:
+            self.assertLessEqual(pixels(regions)[0], full)
+        self.assertLess(pixels([[0.4, 0.4, 0.6, 0.6]])[0], full / 10)
+
+        # Boxes are mapped back to frame coordinates.
+        _, detections = pixels([[0.5, 0.5, 1, 1]])
+        self.assertEqual(detections[0].xyxy, (960, 540, 990, 570))
+
+        # Only degenerate regions: the whole frame is analyzed.
+        self.assertEqual(pixels([[0.5, 0.5, 0.5, 1]])[0], full)
+
+    def test_detect_buckets(self):
+        import numpy as np
+
+        class ShapeDetector(FakeDetector):
+            def detect(self, images):
+                self.shapes.append({image.shape for image in images})
+                return [[image.shape] for image in images]
+
+        detector = ShapeDetector([])
+        images = [
+            np.zeros(shape, dtype=np.uint8)
+            for shape in [(480, 640, 3), (720, 1280, 3), (960, 1280, 3)] * 2
+        ]
+        results = detector.detect_buckets(images)
+
+        self.assertEqual(results, [[image.shape] for image in images])
+        self.assertEqual(len(detector.shapes), 2)
+        for shapes in detector.shapes:
+            batch_shapes = {detector.batch_shape(np.zeros(s)) for s in shapes}
+            self.assertEqual(len(batch_shapes), 1)
+
+        detector = ShapeDetector([])
+        detector.dynamic = False
+        results = detector.detect_buckets(images)
+
+        self.assertEqual(results, [[image.shape] for image in images])
+        self.assertEqual(len(detector.shapes), 1)
+
+    def test_result_cache_perceptual(self):
+        cache = ResultCache(max_distance=4)
+        detections = [Detection((0, 0, 10, 10), 0.9, 0, "no_helmet")]
+        frame = create_image("a.jpg", color=(200, 10, 10)).read()
+        image = Image.open(BytesIO(frame))
+        image.putpixel((0, 0), (0, 0, 0))
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG")
+        near = buffer.getvalue()
+
+        cache.set(cache.key(frame, camera_id=1), detections)
+
+        self.assertIsNone(cache.get(cache.key(near, camera_id=2)))
+        self.assertEqual(cache.get(cache.key(near, camera_id=1)), detections)
+        self.assertEqual(cache.hits["perceptual"], 1)
+
+    def test_result_cache_disk(self):
+        detections = [Detection((0, 0, 10, 10), 0.9, 0, "no_helmet")]
+        frame = create_image("a.jpg").read()
+        directory = tempfile.mkdtemp()
+        ResultCache(directory=directory).set(ResultCache().key(frame), detections)
+
+        cache = ResultCache(directory=directory)
+
+        self.assertEqual(cache.get(cache.key(frame)), detections)
+        self.assertEqual(cache.hits["disk"], 1)
+
+    def test_result_cache_exact_before_perceptual(self):
+        detections = [Detection((0, 0, 10, 10), 0.9, 0, "no_helmet")]
+        frame = create_image("a.jpg", color=(200, 10, 10)).read()
+        near = create_image("b.jpg", color=(10, 200, 10)).read()
+        directory = tempfile.mkdtemp()
+        ResultCache(directory=directory).set(ResultCache().key(frame), detections)
+
+        cache = ResultCache(directory=directory, max_distance=4)
+        cache.remember(cache.key(near), [])
+
+        self.assertEqual(cache.get(cache.key(frame)), detections)
+        self.assertEqual(cache.hits, {"memory": 0, "perceptual": 0, "disk": 1})
+
+    def test_export_rejects_torchscript_quantize(self):
+        with self.assertRaisesMessage(CommandError, "--quantize"):
+            call_command("export_model", format="torchscript", quantize=True)
+
+
+class TestDetectionAPI(TestCase):
+    def setUp(self):
+        camera = Camera.objects.create(name="Test Camera", rtsp_url="rtsp://test.com")
+        self.events = Event.objects.bulk_create(
+            [Event(camera=camera, image="test.jpg") for i in range(3)]
+        )
+        DetectionRow.objects.bulk_create(
+            [
+                DetectionRow(
+                    event=event,
+                    class_name=class_name,
+                    confidence=confidence,
+                    x1=0,
+                    y1=0,
+                    x2=10,
+                    y2=10,
+                )
+                for event, class_name, confidence in [
+                    (self.events[0], "no_helmet", 0.9),
+                    (self.events[0], "person", 0.95),
+                    (self.events[1], "no_helmet", 0.5),
+                    (self.events[2], "person", 0.85),
+                ]
+            ]
+        )
+
+    def test_detection_list(self):
+        endpoint = "/api/v1/ppe/detections?class_name=no_helmet&min_confidence=0.8"
+        response = self.client.get(endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+        item = response.json()["items"][0]
+        self.assertEqual(item["event"], str(self.events[0].uuid))
+        self.assertEqual(item["confidence"], 0.9)
+
+    def test_event_list_detection_filter(self):
+        endpoint = "/api/v1/ppe/events?detection_class=no_helmet&min_confidence=0.4"
+        response = self.client.get(endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item["uuid"] for item in response.json()["items"]},
+            {str(self.events[0].uuid), str(self.events[1].uuid)},
+        )
+
+    def test_event_list_min_confidence_zero(self):
+        Event.objects.create(camera=self.events[0].camera, image="test.jpg")
+        response = self.client.get("/api/v1/ppe/events?min_confidence=0")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item["uuid"] for item in response.json()["items"]},
+            {str(event.uuid) for event in self.events},
+        )
+
+
+class TestSamplingScheduler(TestCase):
+    def test_allocate(self):
+        rates = allocate({"a": 1, "b": 1, "c": 8}, budget=10, min_rate=0.5, max_rate=4)
+
+        self.assertEqual(rates["c"], 4)
+        self.assertAlmostEqual(rates["a"], 3)
+        self.assertAlmostEqual(sum(rates.values()), 10)
+
+        rates = allocate({"a": 1, "b": 100}, budget=10, min_rate=1, max_rate=20)
+
+        self.assertGreaterEqual(rates["a"], 1)
+        self.assertAlmostEqual(sum(rates.values()), 10)
+
+    def test_allocate_within_budget(self):
+        weights = {"busy": 64, **{i: 1 for i in range(100)}}
+        for min_rate in (0.1, 0.05):
+            rates = allocate(weights, budget=10, min_rate=min_rate, max_rate=5)
+
+            self.assertLessEqual(sum(rates.values()), 10 + 1e-9)
+            self.assertGreaterEqual(rates[0], min(min_rate, 10 / len(weights)))
+
+        self.assertGreater(rates["busy"], rates[0])
+
+    def test_step(self):
+        busy = Camera.objects.create(name="Busy", rtsp_url="rtsp://busy.com")
+        idle = Camera.objects.create(name="Idle", rtsp_url="rtsp://idle.com")
+        Camera.objects.create(name="Off", rtsp_url="rtsp://off.com", is_active=False)
+        Event.objects.create(camera=busy, image="test.jpg", is_violation=True)
+        Event.objects.create(camera=idle, image="test.jpg")
+
+        scheduler = SamplingScheduler(budget=6, min_rate=0.1, max_rate=10)
+        for i in range(3):
+            scheduler.step()
+
+        busy.refresh_from_db()
+        idle.refresh_from_db()
+        self.assertEqual(busy.sample_weight, 8)
+        self.assertEqual(idle.sample_weight, 1)
+        self.assertAlmostEqual(busy.sample_rate + idle.sample_rate, 6)
+        self.assertGreater(busy.sample_rate, idle.sample_rate)
+
+        response = self.client.get("/api/v1/ppe/cameras/rates")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item["uuid"]: item["sample_rate"] for item in response.json()},
+            {str(busy.uuid): busy.sample_rate, str(idle.uuid): idle.sample_rate},
+        )
+
+
+class TestAnalysisQueue(TestCase):
+    def setUp(self):
+        self.busy = Camera.objects.create(name="Busy", rtsp_url="rtsp://busy.com")
+        self.quiet = Camera.objects.create(name="Quiet", rtsp_url="rtsp://quiet.com")
+        busy_events = Event.objects.bulk_create(
+            [Event(camera=self.busy, image="test.jpg") for i in range(6)]
+        )
+        quiet_events = Event.objects.bulk_create(
+            [Event(camera=self.quiet, image="test.jpg") for i in range(2)]
+        )
+        AnalysisTask.objects.enqueue(busy_events)
+        AnalysisTask.objects.enqueue(quiet_events)
+        self.quiet_events = quiet_events
+
+    def test_claim_round_robin(self):
+        tasks = AnalysisTask.objects.claim(4, timedelta(minutes=5))
+
+        self.assertEqual(
+            sorted(task.camera_id == self.busy.pk for task in tasks),
+            [False, False, True, True],
+        )
+        self.assertEqual(len(AnalysisTask.objects.claim(10, timedelta(minutes=5))), 4)
+        self.assertEqual(AnalysisTask.objects.claim(10, timedelta(minutes=5)), [])
+        self.assertEqual(len(AnalysisTask.objects.claim(10, timedelta(0))), 8)
+
+    def test_claim_leased_cameras(self):
+        tasks = AnalysisTask.objects.claim(
+            10, timedelta(minutes=5), cameras=[self.quiet.pk]
+        )
+
+        self.assertEqual({task.camera_id for task in tasks}, {self.quiet.pk})
+        self.assertEqual(len(tasks), 2)
+
+    def test_recheck_priority(self):
+        event = Event.objects.create(camera=self.busy, image="test.jpg")
+        response = self.client.post(f"/api/v1/ppe/events/{event.uuid}/recheck")
+
+        self.assertEqual(response.status_code, 200)
+        tasks = AnalysisTask.objects.claim(1, timedelta(minutes=5))
+        self.assertEqual(tasks[0].event, event)
+        self.assertEqual(tasks[0].priority, AnalysisTask.PRIORITY_RECHECK)
+
+    def test_create_event_enqueues(self):
+        payload = {"camera_id": str(self.quiet.uuid), "image": "test.jpg"}
+        self.client.post("/api/v1/ppe/events", payload, content_type="application/json")
+
+        self.assertEqual(AnalysisTask.objects.filter(camera=self.quiet).count(), 3)
+
+    def test_queue_lag(self):
+        response = self.client.get("/api/v1/ppe/analysis/queue")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["depth"], 8)
+        depths = {item["camera"]: item["depth"] for item in response.json()["cameras"]}
+        self.assertEqual(depths, {str(self.busy.uuid): 6, str(self.quiet.uuid): 2})
+        for item in response.json()["cameras"]:
+            self.assertGreaterEqual(item["oldest_age"], 0)
+
+    @skipUnless(find_spec("numpy"), "inference stack is not installed")
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_process_queue(self):
+        from ppe.analysis import process_queue
+
+        AnalysisTask.objects.all().delete()
+        event = Event.objects.create(camera=self.quiet, image=create_image("q.jpg"))
+        AnalysisTask.objects.enqueue([event])
+
+        count = process_queue(detector=FakeDetector(["no_helmet"]), batch_size=2)
+
+        self.assertEqual(count, 1)
+        self.assertFalse(AnalysisTask.objects.exists())
+        self.assertTrue(Event.objects.get(pk=event.pk).is_violation)
+
+    @skipUnless(find_spec("numpy"), "inference stack is not installed")
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_process_queue_skips_broken_image(self):
+        from ppe.analysis import process_queue
+
+        AnalysisTask.objects.all().delete()
+        broken = Event.objects.create(
+            camera=self.quiet, image=ContentFile(b"not a jpeg", name="broken.jpg")
+        )
+        missing = Event.objects.create(camera=self.quiet, image="missing.jpg")
+        event = Event.objects.create(camera=self.quiet, image=create_image("q.jpg"))
+        AnalysisTask.objects.enqueue([broken, missing, event])
+
+        with self.assertLogs("ppe.analysis", "ERROR"):
+            process_queue(detector=FakeDetector(["no_helmet"]), batch_size=8)
+
+        self.assertFalse(AnalysisTask.objects.exists())
+        self.assertTrue(Event.objects.get(pk=event.pk).is_analyzed)
+        self.assertFalse(Event.objects.get(pk=broken.pk).is_analyzed)
+
+    @skipUnless(find_spec("numpy"), "inference stack is not installed")
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_process_queue_sharded_waits(self):
+        from ppe.analysis import process_queue
+
+        AnalysisTask.objects.all().delete()
+        event = Event.objects.create(camera=self.quiet, image=create_image("q.jpg"))
+        AnalysisTask.objects.enqueue([event])
+        first = Shard("first", ttl=timedelta(seconds=30))
+        first.step()
+
+        def first_dies(seconds):
+            past = timezone.now() - timedelta(minutes=1)
+            WorkerNode.objects.filter(name="first").update(heartbeat_at=past)
+            CameraLease.objects.filter(node="first").update(expires_at=past)
+
+        # The second node starts without leases and keeps polling until the
+        # cameras of the first one fail over to it.
+        with mock.patch("ppe.analysis.time.sleep", side_effect=first_dies) as sleep:
+            count = process_queue(
+                detector=FakeDetector(["no_helmet"]),
+                limit=1,
+                shard=Shard("second", ttl=timedelta(seconds=30)),
+                idle=10,
+            )
+
+        self.assertEqual(count, 1)
+        sleep.assert_called_once_with(10)
+        self.assertTrue(Event.objects.get(pk=event.pk).is_violation)
+
+    def test_recheck_keeps_enqueued_at(self):
+        event = self.quiet_events[0]
+        enqueued_at = AnalysisTask.objects.get(event=event).enqueued_at
+
+        AnalysisTask.objects.enqueue([event], priority=AnalysisTask.PRIORITY_RECHECK)
+
+        task = AnalysisTask.objects.get(event=event)
+        self.assertEqual(task.priority, AnalysisTask.PRIORITY_RECHECK)
+        self.assertEqual(task.enqueued_at, enqueued_at)
+
+
+class TestStartup(TestCase):
+    def test_web_process_skips_inference_stack(self):
+        script = (
+            "import sys, settings.wsgi, settings.asgi, settings.urls\n"
+            "print(','.join(sorted({m.split('.')[0] for m in sys.modules})))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+
+        loaded = set(output.strip().split(","))
+        self.assertFalse(loaded & set(HEAVY_MODULES))
+        self.assertNotIn("numpy", loaded)
+
+
+class TestEventBuffer(TestCase):
+    endpoint = "/api/v1/ppe/events"
+
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.buffer = EventBuffer(max_size=2, max_items=2, timeout=0)
+        patcher = mock.patch("ppe.api.get_event_buffer", return_value=self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, **kwargs):
+        payload = {"camera_id": str(self.camera.uuid), "image": "test.jpg", **kwargs}
+        return self.client.post(self.endpoint, payload, content_type="application/json")
+
+    def test_create_event_is_written_behind(self):
+        response = self.post(is_violation=True)
+        self.post(is_analyzed=True)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Event.objects.exists())
+
+        self.buffer.flush()
+
+        self.assertTrue(Event.objects.filter(uuid=response.json()["uuid"]).exists())
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.event_count, 2)
+        self.assertEqual(self.camera.violation_count, 1)
+        self.assertEqual(AnalysisTask.objects.count(), 1)
+
+    def test_create_event_validates(self):
+        response = self.post(camera_id=str(uuid4()))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.delete(f"/api/v1/ppe/cameras/{self.camera.uuid}")
+        response = self.post()
+        self.assertEqual(response.status_code, 404)
+
+        self.assertTrue(self.buffer.queue.empty())
+
+    def test_full_buffer_rejects(self):
+        self.post()
+        self.post()
+        response = self.post()
+
+        self.assertEqual(response.status_code, 503)
+        self.buffer.flush()
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_collect_batches(self):
+        self.buffer.queue.put("first")
+        self.buffer.queue.put("second")
+
+        self.assertEqual(self.buffer.collect(), (["first", "second"], False))
+
+        self.buffer.queue.put(None)
+        self.assertEqual(self.buffer.collect(), ([], True))
+
+    def test_flush_thread_survives_errors(self):
+        with mock.patch("ppe.ingest.write_events", side_effect=RuntimeError):
+            self.buffer.start()
+            with self.assertLogs("ppe.ingest", "ERROR"):
+                self.buffer.put(Event(camera=self.camera))
+                self.buffer.put(Event(camera=self.camera))
+                self.buffer.close()
+
+        self.assertEqual(self.buffer.dropped, 2)
+
+
+class TestEventTimeseries(TestCase):
+    endpoint = "/api/v1/ppe/events/timeseries"
+
+    def setUp(self):
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.start = datetime(2024, 1, 1, 10, tzinfo=UTC)
+
+    def create_event(self, minutes, is_violation=False):
+        event = Event.objects.create(
+            camera=self.camera, image="test.jpg", is_violation=is_violation
+        )
+        Event.objects.filter(pk=event.pk).update(
+            timestamp=self.start + timedelta(minutes=minutes)
+        )
+
+    def get(self, **params):
+        params = {
+            "camera_uuid": str(self.camera.uuid),
+            "start_date": self.start.isoformat(),
+            "end_date": (self.start + timedelta(hours=4)).isoformat(),
+            **params,
+        }
+        return self.client.get(self.endpoint, params)
+
+    def test_timeseries_buckets(self):
+        self.create_event(5)
+        self.create_event(50, is_violation=True)
+        self.create_event(130)
+        self.create_event(-5)
+
+        response = self.get(points=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["step"], 3600)
+        points = response.json()["points"]
+        self.assertEqual([p["events"] for p in points], [2, 0, 1, 0])
+        self.assertEqual([p["violations"] for p in points], [1, 0, 0, 0])
+
+    def test_timeseries_downsample(self):
+        for minutes in range(0, 240, 3):
+            self.create_event(minutes)
+        self.create_event(100, is_violation=True)
+
+        response = self.get(points=10, downsample=True)
+
+        self.assertEqual(response.status_code, 200)
+        points = response.json()["points"]
+        self.assertEqual(len(points), 10)
+        self.assertEqual(sum(p["violations"] for p in points), 1)
+
+    def test_timeseries_rejects_empty_range(self):
+        response = self.get(end_date=self.start.isoformat())
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PPE_MEDIA_WIDTHS=[160, 320])
+class TestEventImage(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(PPE_MEDIA_CACHE_DIR=tempfile.mkdtemp()))
+        get_derivative_cache.cache_clear()
+        self.addCleanup(get_derivative_cache.cache_clear)
+        camera = Camera.objects.create(
+            name="Image Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.event = Event.objects.create(
+            camera=camera, image=create_image("frame.jpg", size=(640, 480))
+        )
+        self.endpoint = f"/api/v1/ppe/events/{self.event.uuid}/image"
+
+    def read(self, response):
+        content = b"".join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_image_cache_headers(self):
+        response = self.client.get(self.endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        with self.event.image.open("rb") as f:
+            self.assertEqual(self.read(response), f.read())
+
+        response = self.client.get(self.endpoint, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_image_resize(self):
+        response = self.client.get(self.endpoint, {"w": 100})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Image.open(BytesIO(self.read(response))).size, (160, 120))
+        self.assertEqual(len(list(get_derivative_cache().directory.glob("*.jpg"))), 1)
+
+        original = self.client.get(self.endpoint)
+        self.assertNotEqual(original["ETag"], response["ETag"])
+        original.close()
+
+    def test_image_etag_follows_file(self):
+        response = self.client.get(self.endpoint, {"w": 160})
+        etag = response["ETag"]
+        self.read(response)
+        other = Event.objects.create(camera=self.event.camera, image=self.event.image)
+        response = self.client.get(f"/api/v1/ppe/events/{other.uuid}/image")
+        self.assertNotEqual(response["ETag"], etag)
+        self.read(response)
+
+        with open(self.event.image.path, "wb") as f:
+            f.write(create_image("frame.jpg", size=(320, 320)).read())
+        response = self.client.get(self.endpoint, {"w": 160})
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(Image.open(BytesIO(self.read(response))).size, (160, 160))
+
+    def test_image_range(self):
+        response = self.client.get(self.endpoint, HTTP_RANGE="bytes=0-9")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(len(response.content), 10)
+        self.assertTrue(response["Content-Range"].startswith("bytes 0-9/"))
+
+    @override_settings(PPE_MEDIA_ACCEL_PREFIX="/protected/")
+    def test_image_accel_redirect(self):
+        response = self.client.get(self.endpoint)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/{self.event.image.name}"
+        )
+        self.assertEqual(response.content, b"")
+
+
+class TestCameraSharding(TestCase):
+    def setUp(self):
+        Camera.objects.bulk_create(
+            [Camera(name=f"Camera {i}", rtsp_url="rtsp://test.com") for i in range(20)]
+        )
+        self.cameras = set(Camera.objects.values_list("pk", flat=True))
+        self.first = Shard("first", ttl=timedelta(seconds=30))
+        self.second = Shard("second", ttl=timedelta(seconds=30))
+
+    def test_leases_balance(self):
+        self.assertEqual(self.first.step(), self.cameras)
+        # Leases of the first node are still valid, nothing to take yet.
+        self.assertEqual(self.second.step(), set())
+
+        first = self.first.step()
+        second = self.second.step()
+
+        self.assertTrue(first and second)
+        self.assertFalse(first & second)
+        self.assertEqual(first | second, self.cameras)
+        self.assertEqual(self.first.step(), first)
+
+    def test_leases_fail_over(self):
+        self.first.step()
+        self.second.step()
+        self.first.step()
+        self.assertNotEqual(self.second.step(), self.cameras)
+
+        # The first node dies: no heartbeat, leases run out.
+        past = timezone.now() - timedelta(minutes=1)
+        WorkerNode.objects.filter(name="first").update(heartbeat_at=past)
+        CameraLease.objects.filter(node="first").update(expires_at=past)
+
+        self.assertEqual(self.second.step(), self.cameras)
+
+    def test_leave_hands_over(self):
+        self.first.step()
+        self.first.leave()
+
+        self.assertFalse(CameraLease.objects.exists())
+        self.assertEqual(self.second.step(), self.cameras)
+
+
+class TestEventArchive(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(PPE_ARCHIVE_DIR=tempfile.mkdtemp()))
+        self.camera = Camera.objects.create(
+            name="Test Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.old = timezone.now() - timedelta(days=400)
+        for days, is_violation in ((0, True), (0, False), (1, False), (400, True)):
+            payload = {
+                "camera_id": str(self.camera.uuid),
+                "image": f"{days}.jpg",
+                "is_violation": is_violation,
+            }
+            response = self.client.post(
+                "/api/v1/ppe/events", payload, content_type="application/json"
+            )
+            Event.objects.filter(uuid=response.json()["uuid"]).update(
+                timestamp=self.old + timedelta(days=days)
+            )
+        self.archived = list(
+            Event.objects.filter(timestamp__lt=self.old + timedelta(days=2))
+            .order_by("pk")
+            .values("uuid", "camera_id", "timestamp", "image", "is_violation")
+        )
+
+    def test_archive_events(self):
+        call_command("archive_events", older_than=365, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(len(list(archive.iter_parts())), 3)
+        rows = sorted(
+            archive.iter_rows(["uuid", "image", "is_violation"]),
+            key=lambda row: row["uuid"],
+        )
+        self.assertEqual(rows, self.archived)
+
+    def test_archive_skips_deleted_events(self):
+        deleted = self.archived.pop()
+        self.client.delete(f"/api/v1/ppe/events/{deleted['uuid']}")
+
+        call_command("archive_events", older_than=365, stdout=StringIO())
+
+        self.assertFalse(Event.all_objects.filter(pk=deleted["uuid"]).exists())
+        uuids = [row["uuid"] for row in archive.iter_rows(["uuid"])]
+        self.assertEqual(sorted(uuids), [row["uuid"] for row in self.archived])
+
+    def test_archive_rollback_removes_part(self):
+        with (
+            mock.patch.object(QuerySet, "delete", side_effect=DatabaseError),
+            self.assertRaises(DatabaseError),
+        ):
+            archive.archive_events(self.old + timedelta(days=2))
+
+        self.assertEqual(list(archive.iter_parts()), [])
+        self.assertEqual(Event.objects.count(), 4)
+
+    def test_archive_after_crash_skips_archived_rows(self):
+        # A crash after the rename but before the DELETE committed.
+        rows = Event.objects.filter(timestamp__lt=self.old + timedelta(days=1))
+        archive.write_part(
+            self.old.astimezone(UTC).date(),
+            list(rows.values(*archive.COLUMNS)),
+        )
+
+        call_command("archive_events", older_than=365, stdout=StringIO())
+
+        self.assertEqual(Event.objects.count(), 1)
+        uuids = [row["uuid"] for row in archive.iter_rows(["uuid"])]
+        self.assertEqual(sorted(uuids), [row["uuid"] for row in self.archived])
+
+    def test_counters_include_archive(self):
+        call_command("archive_events", older_than=365, stdout=StringIO())
+        Camera.objects.update(event_count=0, violation_count=0)
+
+        call_command("recount", stdout=StringIO())
+
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.event_count, 4)
+        self.assertEqual(self.camera.violation_count, 2)
+
+    def test_timeseries_reads_archive(self):
+        call_command("archive_events", older_than=365, stdout=StringIO())
+
+        response = self.client.get(
+            "/api/v1/ppe/events/timeseries",
+            {
+                "camera_uuid": str(self.camera.uuid),
+                "start_date": (self.old - timedelta(days=1)).isoformat(),
+                "points": 10,
+            },
+        )
+
+        points = response.json()["points"]
+        self.assertEqual(sum(p["events"] for p in points), 4)
+        self.assertEqual(sum(p["violations"] for p in points), 2)
+
+
+@override_settings(PPE_SYNC_LAG=0)
+class TestChangesFeed(TestCase):
+    def setUp(self):
+        self.cameras = [
+            Camera.objects.create(name=f"Camera {i}", rtsp_url="rtsp://test.com")
+            for i in range(3)
+        ]
+
+    def changes(self, endpoint, **params):
+        response = self.client.get(endpoint, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_camera_changes(self):
+        endpoint = "/api/v1/ppe/cameras/changes"
+        first = self.changes(endpoint, limit=2)
+        second = self.changes(endpoint, since=first["cursor"], limit=2)
+
+        self.assertTrue(first["has_more"])
+        self.assertFalse(second["has_more"])
+        self.assertEqual(
+            {item["uuid"] for item in first["items"] + second["items"]},
+            {str(camera.uuid) for camera in self.cameras},
+        )
+
+        idle = self.changes(endpoint, since=second["cursor"])
+        self.assertEqual(idle["items"], [])
+        self.assertEqual(idle["cursor"], second["cursor"])
+
+        self.client.put(
+            f"/api/v1/ppe/cameras/{self.cameras[0].uuid}",
+            {"name": "Renamed"},
+            content_type="application/json",
+        )
+        changed = self.changes(endpoint, since=second["cursor"])
+        self.assertEqual([item["name"] for item in changed["items"]], ["Renamed"])
+
+    def test_event_changes_include_soft_deletes(self):
+        endpoint = "/api/v1/ppe/events/changes"
+        event = Event.objects.create(camera=self.cameras[0], image="test.jpg")
+        cursor = self.changes(endpoint)["cursor"]
+
+        response = self.client.delete(f"/api/v1/ppe/events/{event.uuid}")
+        self.assertEqual(response.status_code, 200)
+        changed = self.changes(endpoint, since=cursor)
+
+        self.assertEqual(len(changed["items"]), 1)
+        self.assertTrue(changed["items"][0]["is_deleted"])
+        response = self.client.get(f"/api/v1/ppe/events/{event.uuid}")
+        self.assertEqual(response.status_code, 404)
+
+    def test_camera_delete_is_reported(self):
+        camera = self.cameras[0]
+        event = Event.objects.create(camera=camera, image="test.jpg")
+        AnalysisTask.objects.enqueue([event])
+        cursor = self.changes("/api/v1/ppe/cameras/changes")["cursor"]
+        events_cursor = self.changes("/api/v1/ppe/events/changes")["cursor"]
+
+        self.client.delete(f"/api/v1/ppe/cameras/{camera.uuid}")
+
+        changed = self.changes("/api/v1/ppe/cameras/changes", since=cursor)
+        self.assertEqual(
+            [(item["uuid"], item["is_deleted"]) for item in changed["items"]],
+            [(str(camera.uuid), True)],
+        )
+        changed = self.changes("/api/v1/ppe/events/changes", since=events_cursor)
+        self.assertEqual([item["uuid"] for item in changed["items"]], [str(event.uuid)])
+        self.assertTrue(changed["items"][0]["is_deleted"])
+        self.assertFalse(AnalysisTask.objects.exists())
+        self.assertEqual(
+            self.client.delete(f"/api/v1/ppe/cameras/{camera.uuid}").status_code, 404
+        )
+
+    def test_bulk_update_stamps_each_chunk(self):
+        events = Event.objects.bulk_create(
+            [Event(camera=self.cameras[0], image="test.jpg") for _ in range(2)]
+        )
+        now = timezone.now()
+        stamps = [now, now + timedelta(seconds=1)]
+
+        with mock.patch.object(EventAPI, "bulk_chunk_size", 1), mock.patch(
+            "ppe.api.timezone.now", side_effect=stamps
+        ):
+            EventAPI.bulk_update(
+                Event.objects.filter(pk__in=[e.pk for e in events]),
+                {"is_analyzed": True},
+            )
+
+        updated = Event.objects.filter(pk__in=[e.pk for e in events])
+        self.assertEqual(sorted(updated.values_list("updated_at", flat=True)), stamps)
+
+    def test_malformed_cursor(self):
+        response = self.client.get("/api/v1/ppe/events/changes", {"since": "nope"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(find_spec("numpy"), "inference stack is not installed")
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestFrameRing(TestCase):
+    def setUp(self):
+        import numpy as np
+
+        self.camera = Camera.objects.create(
+            name="Ring Camera", rtsp_url="rtsp://test.com", is_active=True
+        )
+        self.producer = FrameRing.create(slots=2, shape=(48, 64))
+        self.consumer = FrameRing.attach(self.producer.name)
+        self.addCleanup(self.producer.close)
+        self.addCleanup(self.consumer.close)
+        self.frame = np.full((48, 64, 3), 200, dtype=np.uint8)
+
+    def test_ring_handoff(self):
+        import numpy as np
+
+        self.assertTrue(self.producer.put(self.frame, self.camera.pk))
+        self.assertTrue(self.producer.put(self.frame[:32, :40], self.camera.pk))
+        self.assertFalse(self.producer.put(self.frame, self.camera.pk))
+
+        frames = self.consumer.read(8)
+        self.assertEqual([f.image.shape for f in frames], [(48, 64, 3), (32, 40, 3)])
+        self.assertEqual({f.camera_id for f in frames}, {self.camera.pk})
+        self.assertTrue(np.shares_memory(frames[0].image, self.consumer.pixels))
+        del frames
+
+        self.consumer.release(2)
+        self.assertEqual(len(self.producer), 0)
+        self.assertTrue(self.producer.put(self.frame, self.camera.pk))
+
+    def test_close_with_frames_in_use(self):
+        consumer = FrameRing.attach(self.producer.name)
+        self.producer.put(self.frame, self.camera.pk)
+        frames = consumer.read(1)
+
+        with self.assertLogs("ppe.framebuffer", "WARNING"):
+            consumer.close()
+
+        self.assertEqual(int(frames[0].image[0, 0, 0]), 200)
+
+    def test_analyze_frames_failure_removes_images(self):
+        from ppe.analysis import analyze_frames
+
+        self.producer.put(self.frame, self.camera.pk)
+        frames = self.consumer.read(8)
+        directory = Path(TEMP_MEDIA_ROOT) / self.camera.name
+        before = set(directory.glob("*")) if directory.exists() else set()
+
+        with mock.patch.object(
+            DetectionRow.objects, "bulk_create", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            analyze_frames(frames, FakeDetector(["no_helmet"]))
+        del frames
+        self.consumer.release(1)
+
+        self.assertEqual(set(directory.glob("*")), before)
+        self.assertFalse(Event.objects.exists())
+
+    def test_analyze_frames_keeps_violations(self):
+        from ppe.analysis import analyze_frames
+
+        self.producer.put(self.frame, self.camera.pk)
+        frames = self.consumer.read(8)
+
+        self.assertEqual(analyze_frames(frames, FakeDetector(["person"])), [])
+        events = analyze_frames(frames, FakeDetector(["no_helmet"]))
+        del frames
+        self.consumer.release(1)
+
+        event = Event.objects.get(pk=events[0].pk)
+        self.assertTrue(event.is_analyzed)
+        self.assertEqual(event.violation_type, "no_helmet")
+        self.assertEqual(event.detections.count(), 1)
+        with event.image.open("rb") as f:
+            self.assertEqual(Image.open(f).size, (64, 48))
+        self.camera.refresh_from_db()
+        self.assertEqual(self.camera.violation_count, 1)
+
+
+class TestPrimaryKeys(TestCase):
+    def test_uuid7_time_ordered(self):
+        keys = [uuid7() for _ in range(10_000)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual({(key.version, key.variant) for key in keys}, {(7, RFC_4122)})
+
+        now = int(timezone.now().timestamp() * 1000)
+        self.assertLessEqual(abs((keys[-1].int >> 80) - now), 1000)
+
+    def test_model_keys_follow_insert_order(self):
+        camera = Camera.objects.create(name="Test Camera", rtsp_url="rtsp://test.com")
+        events = [Event.objects.create(camera=camera) for _ in range(5)]
+        self.assertEqual([e.pk for e in events], sorted(e.pk for e in events))
+
+        response = self.client.get(f"/api/v1/ppe/cameras/{camera.uuid}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["uuid"], str(camera.uuid))